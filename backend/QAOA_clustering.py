@@ -1,8 +1,12 @@
+import hashlib
 import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import networkx as nx
 import numpy as np
 import openai
-import pandas as pd
 
 from qiskit_algorithms.minimum_eigensolvers import QAOA
 from qiskit_algorithms.optimizers import COBYLA
@@ -10,37 +14,62 @@ from qiskit_aer import AerSimulator
 from qiskit_aer.primitives import Sampler  # new primitive interface for simulation
 from qiskit.quantum_info import SparsePauliOp
 
+from parquet_loader import load_risks
+from profiling import profiled, print_summary, stage, write_run_report
+
 # Define the identity and Pauli-Z operators (for single qubit)
 I_single = SparsePauliOp("I")
 Z_single = SparsePauliOp("Z")
 
+# Largest number of students solved directly on the simulator
+MAX_QUBITS = 20
+
+# Student similarity weights used by build_graph and partition_tutor_groups
+SAME_AREA_WEIGHT = 1.0
+OTHER_AREA_WEIGHT = 0.1
+
+# Optimal QAOA parameters from earlier runs, keyed by graph signature
+QAOA_PARAMS_FILE = "qaoa_params.json"
+
+# On-disk cache of finished clustering runs, evicted least-recently-used first
+CACHE_DIR = ".clustering_cache"
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Size limits used by select_solver when no time budget is given
+EXACT_MAX_NODES = 20
+SDP_MAX_NODES = 2000
+
+# Largest quotient search space (product of class sizes + 1) enumerated exactly
+COARSE_MAX_STATES = 1 << 20
+
 def load_students(filename):
     """
     Loads student records from a Parquet file.
     Each record has fields like:
     "student_id", "course_name", "failure_prob", "weakest_area", etc.
     """
-    students = pd.read_parquet(filename).to_dict(orient='records')
+    students = load_risks(filename).to_dict(orient='records')
     return students
 
 def build_graph(students):
     """
     Constructs a graph where:
-      - Each node represents a student (using student_id).
+      - Each node represents a student, keyed by its integer student_code
+        when the data has one (student_id otherwise); the ID stays a node
+        attribute for reports.
       - An edge is added between every pair of students.
       - Edge weight is 1.0 if students share the same 'weakest_area' and 0.1 otherwise.
     """
     G = nx.Graph()
     for student in students:
-        student_id = student["student_id"]
-        G.add_node(student_id, **student)
+        G.add_node(student.get("student_code", student["student_id"]), **student)
     
     student_ids = list(G.nodes)
     for i in range(len(student_ids)):
         for j in range(i+1, len(student_ids)):
             s1 = G.nodes[student_ids[i]]
             s2 = G.nodes[student_ids[j]]
-            weight = 1.0 if s1["weakest_area"] == s2["weakest_area"] else 0.1
+            weight = SAME_AREA_WEIGHT if s1["weakest_area"] == s2["weakest_area"] else OTHER_AREA_WEIGHT
             G.add_edge(student_ids[i], student_ids[j], weight=weight)
     return G
 
@@ -50,67 +79,741 @@ def get_maxcut_operator(G):
     For each edge (i, j) with weight w, the term is:
         (w/2) * (I - Z_i Z_j)
     The overall cost operator is the sum over all edges.
+
+    The operator is assembled in one call from an index-based sparse list of
+    ("ZZ", [i, j], -w/2) terms, with the identity parts of every edge summed
+    into a single constant. Node i maps to qubit n-1-i so that character i of
+    a measured bitstring still corresponds to nodes[i].
     """
     n = len(G.nodes)
+    index = {node: k for k, node in enumerate(G.nodes)}
+
+    sparse_terms = []
+    constant = 0.0
+    for u, v, weight in G.edges(data="weight", default=1.0):
+        i, j = index[u], index[v]
+        if i == j:
+            continue
+        sparse_terms.append(("ZZ", [n - 1 - i, n - 1 - j], -0.5 * weight))
+        constant += 0.5 * weight
+    sparse_terms.append(("", [], constant))
+
+    return SparsePauliOp.from_sparse_list(sparse_terms, num_qubits=n)
+
+def graph_to_weight_matrix(G):
+    """
+    Returns the node ordering of G and its symmetric edge-weight matrix.
+    Missing edges have weight 0 and the diagonal is always 0.
+    """
     nodes = list(G.nodes)
-    # Initialize the cost operator as the zero operator
-    cost_op = SparsePauliOp.from_list([("I"*n, 0.0)])
-    
-    # Loop over each edge in the graph
-    for i in range(n):
-        for j in range(i+1, n):
-            if G.has_edge(nodes[i], nodes[j]):
-                weight = G[nodes[i]][nodes[j]]["weight"]
-                # Build a pauli string with I everywhere except Z at positions i and j
-                pauli_list = ["I"] * n
-                pauli_list[i] = "Z"
-                pauli_list[j] = "Z"
-                pauli_label = "".join(pauli_list)
-                # Construct the term: (w/2)*(I - Z_i Z_j)
-                ident_op = SparsePauliOp.from_list([("I"*n, 1.0)])
-                zz_op = SparsePauliOp.from_list([(pauli_label, 1.0)])
-                term = 0.5 * weight * (ident_op - zz_op)
-                cost_op = cost_op + term
-    return cost_op
-
-def run_qaoa(G):
+    W = nx.to_numpy_array(G, nodelist=nodes, weight="weight", dtype=float)
+    np.fill_diagonal(W, 0.0)
+    return nodes, W
+
+def cut_value(W, assignment):
+    """
+    Returns the MAXCUT value of one assignment (shape (n,)) or of a batch of
+    assignments (shape (k, n)) of 0/1 labels against weight matrix W.
+    """
+    spins = 1.0 - 2.0 * np.asarray(assignment, dtype=float)
+    total = W.sum() / 2.0
+    if spins.ndim == 1:
+        return (total - spins @ W @ spins / 2.0) / 2.0
+    return (total - np.einsum("ki,ij,kj->k", spins, W, spins) / 2.0) / 2.0
+
+def refine_cut(W, assignment, max_flips=None):
+    """
+    Greedy single-node local search: repeatedly flips the node with the
+    largest positive gain in cut value until no flip improves the cut.
+    Works for any symmetric W, including negative weights.
+    Returns the refined 0/1 assignment as a numpy array.
+    """
+    n = W.shape[0]
+    spins = 1.0 - 2.0 * np.asarray(assignment, dtype=float)
+    field = W @ spins
+    if max_flips is None:
+        max_flips = 10 * n + 10
+    for _ in range(max_flips):
+        # Flipping node i changes the cut by s_i * (W s)_i
+        gains = spins * field
+        i = int(np.argmax(gains))
+        if gains[i] <= 1e-12:
+            break
+        field -= 2.0 * spins[i] * W[:, i]
+        spins[i] = -spins[i]
+    return ((1.0 - spins) / 2.0).astype(np.int8)
+
+class MaxcutResult:
+    """
+    Minimal solver result shared by the non-QAOA code paths.
+    Mirrors the `eigenvalue` and `best_measurement` fields of the QAOA
+    result so it can be passed straight to interpret_qaoa_result.
+    """
+    def __init__(self, assignment, cut, solver, **info):
+        self.assignment = np.asarray(assignment, dtype=np.int8)
+        self.cut_value = float(cut)
+        self.solver = solver
+        self.info = info
+        bitstring = "".join(str(int(b)) for b in self.assignment)
+        self.eigenvalue = complex(-self.cut_value)
+        self.best_measurement = {
+            "bitstring": bitstring,
+            "value": self.eigenvalue,
+            "probability": 1.0,
+        }
+
+    def __repr__(self):
+        return (f"MaxcutResult(solver={self.solver}, n={len(self.assignment)}, "
+                f"cut_value={self.cut_value:.3f})")
+
+@profiled("run_qaoa")
+def run_qaoa(G, reps=1, initial_point=None, maxiter=250):
     """
     Sets up and runs QAOA for the MAXCUT instance defined by graph G.
+    initial_point optionally warm-starts COBYLA with 2 * reps parameters.
     Returns the QAOA result.
     """
     n = len(G.nodes)
-    cost_operator = get_maxcut_operator(G)
+    # QAOA finds the minimum eigenvalue, so negate the cut Hamiltonian to
+    # make the lowest-energy state the maximum cut.
+    with stage("operator_construction", rows=n):
+        cost_operator = -get_maxcut_operator(G)
     
-    optimizer = COBYLA(maxiter=250)
+    optimizer = COBYLA(maxiter=maxiter)
     simulator = AerSimulator()
     
     # With the new primitive interface, you might use Sampler for measurement.
     sampler = Sampler(backend=simulator)
     
-    # Configure QAOA with 1 repetition (layer)
-    qaoa = QAOA(optimizer=optimizer, reps=1, sampler=sampler)
+    # Configure QAOA with the requested number of repetitions (layers)
+    qaoa = QAOA(optimizer=optimizer, reps=reps, sampler=sampler, initial_point=initial_point)
     
-    result = qaoa.compute_minimum_eigenvalue(operator=cost_operator)
+    with stage("optimization", rows=n):
+        result = qaoa.compute_minimum_eigenvalue(operator=cost_operator)
     
-    print("Optimal (minimum) cost value:", result.eigenvalue.real)
+    print("Optimal cut value:", -result.eigenvalue.real)
     print("QAOA raw state (amplitudes):")
     print(result.eigenstate)
     
     return result
 
+def sampled_distribution(result):
+    """
+    Returns the measured distribution of a result as two parallel sequences:
+    basis-state indices (Python ints, so any number of qubits works) and
+    their probabilities.
+    Sampler results are read straight from their sparse quasi-distribution;
+    only nonzero entries of a dense statevector are kept.
+    """
+    state = result.eigenstate
+    if hasattr(state, "items"):
+        keys = list(state.keys())
+        probabilities = np.fromiter(state.values(), dtype=float, count=len(keys))
+        if keys and isinstance(keys[0], str):
+            keys = [int(key, 16) if key.startswith("0x") else int(key, 2) for key in keys]
+        return keys, probabilities
+    # Dense statevector: square the amplitudes
+    probabilities = np.abs(np.asarray(state).ravel())**2
+    indices = np.flatnonzero(probabilities)
+    return indices.tolist(), probabilities[indices]
+
+def top_k_bitstrings(result, W, k=5):
+    """
+    Returns the k most probable bitstrings of a result, each as a dict with
+    its probability and MAXCUT value against weight matrix W.
+    Memory is proportional to the number of distinct samples, not 2^n.
+    """
+    n = W.shape[0]
+    indices, probabilities = sampled_distribution(result)
+    if len(indices) == 0:
+        return []
+    k = min(k, len(indices))
+    top = np.argpartition(-probabilities, k - 1)[:k]
+    top = top[np.argsort(-probabilities[top], kind="stable")]
+
+    bitstrings = [format(indices[t], f"0{n}b") for t in top]
+    assignments = (np.frombuffer("".join(bitstrings).encode(), dtype=np.uint8)
+                   .reshape(k, n) - ord("0"))
+    cuts = cut_value(W, assignments)
+    return [
+        {"bitstring": b, "probability": float(probabilities[t]), "cut_value": float(c)}
+        for b, t, c in zip(bitstrings, top, cuts)
+    ]
+
+def best_bitstring_from_result(result, n):
+    """
+    Returns the best bitstring of a solver result: its `best_measurement`,
+    the sampled bitstring with the lowest energy, which need not be the
+    most probable one. Results without it fall back to the most probable
+    bitstring of the sparse sampled distribution.
+    """
+    best_measurement = getattr(result, "best_measurement", None)
+    if best_measurement and best_measurement.get("bitstring"):
+        return best_measurement["bitstring"].zfill(n)
+    indices, probabilities = sampled_distribution(result)
+    best_index = indices[int(np.argmax(probabilities))]
+    # Convert index to bitstring with leading zeros
+    return format(best_index, f"0{n}b")
+
+def partition_nodes(W, max_size):
+    """
+    Splits node indices 0..n-1 into blocks of at most max_size nodes by
+    recursive spectral bisection: each block is cut at the median of the
+    Fiedler vector of its Laplacian, keeping strongly connected students
+    together so the subproblems retain most of the edge weight.
+    """
+    blocks = []
+    pending = [np.arange(W.shape[0])]
+    while pending:
+        idx = pending.pop()
+        if len(idx) <= max_size:
+            blocks.append(idx)
+            continue
+        sub = W[np.ix_(idx, idx)]
+        laplacian = np.diag(sub.sum(axis=1)) - sub
+        _, vectors = np.linalg.eigh(laplacian)
+        order = np.argsort(vectors[:, 1], kind="stable")
+        half = len(idx) // 2
+        pending.append(idx[order[half:]])
+        pending.append(idx[order[:half]])
+    return blocks
+
+def _solve_block_qaoa(W_block):
+    """Process-pool worker: runs QAOA on one block and returns its 0/1 labels."""
+    G_block = nx.from_numpy_array(W_block)
+    result = run_qaoa(G_block)
+    bitstring = best_bitstring_from_result(result, W_block.shape[0])
+    return np.array([int(b) for b in bitstring], dtype=np.int8)
+
+def stitch_blocks(W, blocks, block_assignments):
+    """
+    Combines independently solved blocks into one global assignment.
+    Each block's labels are only defined up to a global flip, so choosing the
+    flips is itself a MAXCUT on the block graph whose weights are the
+    cross-block couplings; it is solved with refine_cut.
+    """
+    n = W.shape[0]
+    spins = np.empty(n)
+    for idx, labels in zip(blocks, block_assignments):
+        spins[idx] = 1.0 - 2.0 * labels
+    membership = np.zeros((len(blocks), n))
+    for b, idx in enumerate(blocks):
+        membership[b, idx] = spins[idx]
+    coupling = membership @ W @ membership.T
+    np.fill_diagonal(coupling, 0.0)
+    flips = refine_cut(coupling, np.zeros(len(blocks)))
+    for b, idx in enumerate(blocks):
+        if flips[b]:
+            spins[idx] = -spins[idx]
+    return ((1.0 - spins) / 2.0).astype(np.int8)
+
+def run_qaoa_decomposed(G, max_qubits=12, max_workers=None):
+    """
+    Solves MAXCUT on graphs larger than the simulator can hold.
+    The graph is partitioned into blocks of at most max_qubits students,
+    each block is solved with QAOA in a process pool, and the block
+    solutions are stitched together and locally refined on the full graph.
+    Returns a MaxcutResult.
+    """
+    nodes, W = graph_to_weight_matrix(G)
+    blocks = partition_nodes(W, max_qubits)
+    sub_matrices = [W[np.ix_(idx, idx)] for idx in blocks]
+    print(f"Decomposing {len(nodes)} students into {len(blocks)} blocks "
+          f"of at most {max_qubits} qubits")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        block_assignments = list(pool.map(_solve_block_qaoa, sub_matrices))
+
+    stitched = stitch_blocks(W, blocks, block_assignments)
+    refined = refine_cut(W, stitched)
+    result = MaxcutResult(
+        refined, cut_value(W, refined), "qaoa-decomposed",
+        num_blocks=len(blocks), stitched_cut_value=float(cut_value(W, stitched)),
+    )
+    print("Optimal cut value:", result.cut_value)
+    return result
+
+def graph_signature(W):
+    """
+    Returns a signature of a MAXCUT instance's structure: its node count,
+    edge count and weight histogram (each distinct edge weight with how
+    often it occurs). Cohorts with the same mix of weak areas share a
+    signature, and their optimal parameters are a good starting point for
+    each other; any other graph starts cold.
+    """
+    upper = np.round(W[np.triu_indices_from(W, k=1)], 3)
+    weights, counts = np.unique(upper[upper != 0], return_counts=True)
+    digest = hashlib.sha1(np.array([W.shape[0], counts.sum()], dtype=np.int64).tobytes())
+    digest.update(weights.tobytes())
+    digest.update(counts.astype(np.int64).tobytes())
+    return digest.hexdigest()[:16]
+
+def load_qaoa_params(W, reps, filename=QAOA_PARAMS_FILE):
+    """
+    Looks up stored optimal parameters for a graph with W's signature and
+    the given reps. Returns a list of 2 * reps floats, or None when nothing
+    is stored.
+    """
+    if not os.path.exists(filename):
+        return None
+    with open(filename) as f:
+        store = json.load(f)
+    entries = [e for e in store.get(graph_signature(W), []) if e["reps"] == reps]
+    if not entries:
+        return None
+    return entries[-1]["optimal_point"]
+
+def save_qaoa_params(W, reps, optimal_point, cut, filename=QAOA_PARAMS_FILE):
+    """
+    Stores the optimal parameters of a run under W's signature, replacing
+    any earlier entry with the same node count and reps.
+    """
+    store = {}
+    if os.path.exists(filename):
+        with open(filename) as f:
+            store = json.load(f)
+    entries = [e for e in store.get(graph_signature(W), [])
+               if not (e["n"] == W.shape[0] and e["reps"] == reps)]
+    entries.append({"n": W.shape[0], "reps": reps,
+                    "optimal_point": [float(p) for p in optimal_point],
+                    "cut_value": float(cut)})
+    store[graph_signature(W)] = entries
+    # Written atomically, so a concurrent reader never sees a partial file
+    tmp_path = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(store, f, indent=2)
+    os.replace(tmp_path, filename)
+
+def interpolate_qaoa_params(point, reps):
+    """
+    Extends a reps-layer parameter vector to reps + 1 layers by linear
+    interpolation of each half (the beta and gamma schedules), so the
+    deeper circuit starts close to the shallower optimum.
+    """
+    point = np.asarray(point, dtype=float)
+    new_reps = reps + 1
+    grid_old = np.linspace(0.0, 1.0, reps) if reps > 1 else np.array([0.5])
+    grid_new = np.linspace(0.0, 1.0, new_reps)
+    halves = [np.interp(grid_new, grid_old, point[k * reps:(k + 1) * reps]) for k in range(2)]
+    return np.concatenate(halves)
+
+def _run_qaoa_from_point(args):
+    """Process-pool worker: one QAOA optimisation from one initial point."""
+    W, reps, initial_point, maxiter = args
+    result = run_qaoa(nx.from_numpy_array(W), reps=reps,
+                      initial_point=initial_point, maxiter=maxiter)
+    bitstring = best_bitstring_from_result(result, W.shape[0])
+    assignment = np.array([int(b) for b in bitstring], dtype=np.int8)
+    return {
+        "assignment": assignment,
+        "cut_value": float(cut_value(W, assignment)),
+        "eigenvalue": float(result.eigenvalue.real),
+        "optimal_point": np.asarray(result.optimal_point, dtype=float),
+        "evaluations": int(result.cost_function_evals),
+    }
+
+def run_qaoa_multistart(G, num_starts=4, reps=1, max_reps=None, maxiter=250,
+                        max_workers=None, params_file=QAOA_PARAMS_FILE, seed=42):
+    """
+    Runs QAOA from several initial points in a process pool and keeps the
+    best run by energy.
+    The first start is warm-started from parameters stored for a graph with the same
+    signature; the rest are random. When max_reps > reps the depth is
+    increased one layer at a time, and each deeper level is warm-started from
+    the interpolated optimum of the previous one. The best parameters for
+    every depth are saved back to params_file.
+    Returns a MaxcutResult whose info includes the total circuit evaluations.
+    """
+    _, W = graph_to_weight_matrix(G)
+    rng = np.random.default_rng(seed)
+    if max_reps is None:
+        max_reps = reps
+
+    best, previous, total_evaluations = None, None, 0
+    warm_point = load_qaoa_params(W, reps, params_file)
+    warm_started = warm_point is not None
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for p in range(reps, max_reps + 1):
+            if p > reps:
+                stored = load_qaoa_params(W, p, params_file)
+                warm_point = stored if stored is not None else interpolate_qaoa_params(previous["optimal_point"], p - 1)
+            starts = [rng.uniform(-np.pi, np.pi, size=2 * p) for _ in range(num_starts)]
+            if warm_point is not None:
+                starts[0] = np.asarray(warm_point, dtype=float)
+            runs = list(pool.map(_run_qaoa_from_point, [(W, p, x, maxiter) for x in starts]))
+            total_evaluations += sum(run["evaluations"] for run in runs)
+
+            level_best = min(runs, key=lambda run: run["eigenvalue"])
+            save_qaoa_params(W, p, level_best["optimal_point"], level_best["cut_value"], params_file)
+            print(f"reps={p}: best energy {level_best['eigenvalue']:.4f}, "
+                  f"cut value {level_best['cut_value']:.3f}, evaluations {total_evaluations}")
+            # The next depth always grows from this level's optimum, even
+            # when a shallower level still holds the best cut
+            previous = level_best
+            if best is None or level_best["cut_value"] >= best["cut_value"]:
+                best = dict(level_best, reps=p)
+
+    return MaxcutResult(best["assignment"], best["cut_value"], "qaoa_multistart",
+                        reps=best["reps"], optimal_point=best["optimal_point"].tolist(),
+                        evaluations=total_evaluations, warm_started=warm_started)
+
+# --------------------------
+# MAXCUT solver backends
+# --------------------------
+# Every backend takes the symmetric weight matrix W (plus an optional time
+# budget in seconds) and returns a MaxcutResult, so callers can swap QAOA
+# for a classical method without touching the decoding code.
+
+def solve_exact(W, time_budget=None, chunk_size=1 << 16):
+    """
+    Exact MAXCUT by vectorised enumeration of all 2^(n-1) assignments
+    (node 0 is fixed to group A, since flipping every label gives the same cut).
+    Assignments are scored in chunks to keep memory bounded.
+    """
+    n = W.shape[0]
+    if n <= 1:
+        return MaxcutResult(np.zeros(n), 0.0, "exact")
+    shifts = np.arange(n - 2, -1, -1, dtype=np.int64)
+    best_cut, best_index = -np.inf, 0
+    total = 1 << (n - 1)
+    for start in range(0, total, chunk_size):
+        indices = np.arange(start, min(start + chunk_size, total), dtype=np.int64)
+        bits = ((indices[:, None] >> shifts) & 1).astype(np.int8)
+        candidates = np.hstack([np.zeros((len(indices), 1), dtype=np.int8), bits])
+        cuts = cut_value(W, candidates)
+        k = int(np.argmax(cuts))
+        if cuts[k] > best_cut:
+            best_cut, best_index = cuts[k], indices[k]
+    best = np.array([0] + [(best_index >> s) & 1 for s in shifts], dtype=np.int8)
+    return MaxcutResult(best, best_cut, "exact")
+
+def solve_sdp(W, time_budget=None, rank=None, sweeps=100, num_hyperplanes=256, seed=42):
+    """
+    Goemans-Williamson-style relaxation. The MAXCUT SDP is solved in
+    low-rank form (each node becomes a unit vector, updated by coordinate
+    "mixing" sweeps), then rounded with a batch of random hyperplanes and
+    polished with refine_cut.
+    """
+    n = W.shape[0]
+    rng = np.random.default_rng(seed)
+    if rank is None:
+        rank = min(n, max(2, int(np.ceil(np.sqrt(2 * n)))))
+    V = rng.normal(size=(n, rank))
+    V /= np.linalg.norm(V, axis=1, keepdims=True)
+
+    start = time.perf_counter()
+    for _ in range(sweeps):
+        previous = V.copy()
+        for i in range(n):
+            g = W[i] @ V
+            norm = np.linalg.norm(g)
+            if norm > 0:
+                V[i] = -g / norm
+        if np.abs(V - previous).max() < 1e-6:
+            break
+        if time_budget is not None and time.perf_counter() - start > time_budget / 2:
+            break
+
+    hyperplanes = rng.normal(size=(rank, num_hyperplanes))
+    candidates = (V @ hyperplanes > 0).T.astype(np.int8)
+    cuts = cut_value(W, candidates)
+    rounded = candidates[int(np.argmax(cuts))]
+    refined = refine_cut(W, rounded)
+    return MaxcutResult(refined, cut_value(W, refined), "sdp",
+                        rounded_cut_value=float(cuts.max()))
+
+def solve_local_search(W, time_budget=None, restarts=20, seed=42):
+    """
+    Randomised multi-start local search: each restart draws a random
+    assignment and applies refine_cut. Stops early when the time budget runs out.
+    """
+    n = W.shape[0]
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    best, best_cut = np.zeros(n, dtype=np.int8), -np.inf
+    for attempt in range(restarts):
+        candidate = refine_cut(W, rng.integers(0, 2, size=n))
+        cut = cut_value(W, candidate)
+        if cut > best_cut:
+            best, best_cut = candidate, cut
+        if time_budget is not None and time.perf_counter() - start > time_budget:
+            break
+    return MaxcutResult(best, best_cut, "local_search", restarts=attempt + 1)
+
+def solve_qaoa(W, time_budget=None):
+    """
+    QAOA backend: runs run_qaoa on graphs that fit on the simulator and
+    run_qaoa_decomposed on larger ones.
+    """
+    G = nx.from_numpy_array(W)
+    if W.shape[0] > MAX_QUBITS:
+        return run_qaoa_decomposed(G, max_qubits=MAX_QUBITS)
+    qaoa_result = run_qaoa(G)
+    bitstring = best_bitstring_from_result(qaoa_result, W.shape[0])
+    assignment = np.array([int(b) for b in bitstring], dtype=np.int8)
+    return MaxcutResult(assignment, cut_value(W, assignment), "qaoa",
+                        qaoa_result=qaoa_result)
+
+def solve_qaoa_multistart(W, time_budget=None):
+    """
+    QAOA backend with parallel multi-start and warm-started parameters.
+    Graphs too large for the simulator go to run_qaoa_decomposed, as in solve_qaoa.
+    """
+    G = nx.from_numpy_array(W)
+    if W.shape[0] > MAX_QUBITS:
+        return run_qaoa_decomposed(G, max_qubits=MAX_QUBITS)
+    return run_qaoa_multistart(G)
+
+def find_twin_classes(W, atol=1e-9):
+    """
+    Groups interchangeable nodes. Nodes i and j are twins when
+    W[i, k] == W[j, k] for every other node k, so swapping them never changes
+    a cut value. Only the weight matrix is used, so richer similarity weights
+    in build_graph are handled automatically.
+    Twins always have the same sorted row, so rows are first bucketed by
+    that signature and only nodes within a bucket are compared.
+    Returns a list of index arrays ordered by their first node.
+    """
+    n = W.shape[0]
+    signatures = np.round(np.sort(W, axis=1), 9)
+    buckets = {}
+    for i in range(n):
+        buckets.setdefault(signatures[i].tobytes(), []).append(i)
+
+    classes = []
+    for members in buckets.values():
+        reps, bucket_classes = [], []
+        for i in members:
+            if reps:
+                diff = np.abs(W[reps] - W[i])
+                diff[:, i] = 0.0
+                diff[np.arange(len(reps)), reps] = 0.0
+                matches = np.flatnonzero(diff.max(axis=1) <= atol)
+                if len(matches):
+                    bucket_classes[matches[0]].append(i)
+                    continue
+            reps.append(i)
+            bucket_classes.append([i])
+        classes.extend(bucket_classes)
+    classes.sort(key=lambda c: c[0])
+    return [np.array(c) for c in classes]
+
+def quotient_problem(W, classes):
+    """
+    Returns the class sizes m, intra-class weights a and inter-class weight
+    matrix B of the quotient graph. If t[c] members of class c go to group B,
+    the exact cut value is
+        sum_c a_c t_c (m_c - t_c) + t . (B m) - t^T B t
+    """
+    reps = np.array([c[0] for c in classes])
+    sizes = np.array([len(c) for c in classes], dtype=np.int64)
+    intra = np.array([W[c[0], c[1]] if len(c) > 1 else 0.0 for c in classes])
+    inter = W[np.ix_(reps, reps)].copy()
+    np.fill_diagonal(inter, 0.0)
+    return sizes, intra, inter
+
+def quotient_cut_values(T, sizes, intra, inter):
+    """Vectorised quotient cut value for a batch of count vectors T (shape (k, C))."""
+    T = np.asarray(T, dtype=float)
+    return ((intra * T * (sizes - T)).sum(axis=1) + T @ (inter @ sizes)
+            - np.einsum("kc,cd,kd->k", T, inter, T))
+
+def solve_coarsened(W, time_budget=None, restarts=20, seed=42, chunk_size=1 << 16):
+    """
+    Lossless coarsening backend. Interchangeable students are merged into
+    classes, and the reduced problem (how many students of each class go to
+    group B) is solved on the quotient graph. The count vectors are
+    enumerated exactly when the space is at most COARSE_MAX_STATES,
+    otherwise coordinate ascent with random restarts is used. The counts are
+    then expanded back to a per-student assignment and rescored on W.
+    """
+    n = W.shape[0]
+    classes = find_twin_classes(W)
+    sizes, intra, inter = quotient_problem(W, classes)
+    radix = sizes + 1
+    num_states = int(np.prod(radix.astype(object)))
+
+    if num_states <= COARSE_MAX_STATES:
+        strides = np.cumprod(np.concatenate([[1], radix[:-1]]))
+        best_cut, best_counts = -np.inf, np.zeros(len(classes), dtype=np.int64)
+        for start in range(0, num_states, chunk_size):
+            indices = np.arange(start, min(start + chunk_size, num_states), dtype=np.int64)
+            T = (indices[:, None] // strides) % radix
+            cuts = quotient_cut_values(T, sizes, intra, inter)
+            k = int(np.argmax(cuts))
+            if cuts[k] > best_cut:
+                best_cut, best_counts = cuts[k], T[k]
+        method = "enumeration"
+    else:
+        rng = np.random.default_rng(seed)
+        start_time = time.perf_counter()
+        best_cut, best_counts = -np.inf, None
+        for _ in range(restarts):
+            counts = rng.integers(0, radix)
+            improved = True
+            while improved:
+                improved = False
+                for c in range(len(classes)):
+                    # The cut is quadratic in counts[c]; try the ends and the vertex
+                    slope = intra[c] * sizes[c] + (inter @ sizes)[c] - 2 * (inter[c] @ counts)
+                    vertex = slope / (2 * intra[c]) if intra[c] > 0 else 0.0
+                    options = np.unique(np.clip(
+                        [0, sizes[c], np.floor(vertex), np.ceil(vertex)], 0, sizes[c]
+                    ).astype(np.int64))
+                    trial = np.repeat(counts[None, :], len(options), axis=0)
+                    trial[:, c] = options
+                    cuts = quotient_cut_values(trial, sizes, intra, inter)
+                    best_option = options[int(np.argmax(cuts))]
+                    if cuts.max() > quotient_cut_values(counts[None, :], sizes, intra, inter)[0] + 1e-12:
+                        counts[c] = best_option
+                        improved = True
+            cut = quotient_cut_values(counts[None, :], sizes, intra, inter)[0]
+            if cut > best_cut:
+                best_cut, best_counts = cut, counts.copy()
+            if time_budget is not None and time.perf_counter() - start_time > time_budget:
+                break
+        method = "coordinate_ascent"
+
+    assignment = np.zeros(n, dtype=np.int8)
+    for members, count in zip(classes, best_counts):
+        assignment[members[:int(count)]] = 1
+    return MaxcutResult(assignment, cut_value(W, assignment), "coarsened",
+                        num_classes=len(classes), quotient_states=num_states,
+                        quotient_cut_value=float(best_cut), method=method)
+
+SOLVERS = {
+    "exact": solve_exact,
+    "sdp": solve_sdp,
+    "local_search": solve_local_search,
+    "qaoa": solve_qaoa,
+    "qaoa_multistart": solve_qaoa_multistart,
+    "coarsened": solve_coarsened,
+}
+
+def select_solver(n, time_budget=None):
+    """
+    Picks a classical backend from the graph size and an optional time
+    budget in seconds: exact enumeration for small graphs, the SDP relaxation
+    for medium graphs, and local search for everything else.
+    The per-backend cost estimates are rough and only need to be right to
+    within an order of magnitude.
+    """
+    if n <= EXACT_MAX_NODES:
+        estimated = (2 ** max(n - 1, 0)) * n * n * 2e-9
+        if time_budget is None or estimated <= time_budget:
+            return "exact"
+    if n <= SDP_MAX_NODES:
+        estimated = 20 * n * n * max(2, np.sqrt(2 * n)) * 1e-8
+        if time_budget is None or estimated <= time_budget:
+            return "sdp"
+    return "local_search"
+
+def solve_maxcut(G, solver="auto", time_budget=None):
+    """
+    Solves MAXCUT on G with the named backend from SOLVERS. With solver
+    "auto", graphs whose interchangeable students collapse to at most half
+    as many classes use the "coarsened" backend; all others use the
+    backend chosen by select_solver.
+    Returns a MaxcutResult whose info records the wall time in seconds.
+    """
+    nodes, W = graph_to_weight_matrix(G)
+    if solver == "auto":
+        if len(find_twin_classes(W)) <= len(nodes) // 2:
+            solver = "coarsened"
+        else:
+            solver = select_solver(len(nodes), time_budget)
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver '{solver}'. Choose from: {', '.join(SOLVERS)}")
+
+    start = time.perf_counter()
+    result = SOLVERS[solver](W, time_budget=time_budget)
+    result.info["elapsed_seconds"] = time.perf_counter() - start
+    print(f"Solver: {result.solver}, cut value: {result.cut_value:.3f}, "
+          f"time: {result.info['elapsed_seconds']:.3f}s")
+    return result
+
+# --------------------------
+# k-way tutor group partitioning
+# --------------------------
+
+def group_name(index):
+    """Returns "Group A", ..., "Group Z", "Group AA", ... for a 0-based index."""
+    letters = ""
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return f"Group {letters}"
+
+def partition_tutor_groups(students, k, max_group_size, min_group_size=None, sweeps=10,
+                           area_key="weakest_area"):
+    """
+    Splits students into k tutoring groups of between min_group_size
+    (default n // k, so groups stay balanced) and max_group_size students,
+    maximising the number of students inside a group who share area_key.
+    build_graph gives every pair at least OTHER_AREA_WEIGHT; that uniform
+    part only rewards piling students into the biggest groups, so a
+    student's affinity to a group is just its same-area count, taken from
+    the group's per-area counts without building the dense graph.
+    Groups start as balanced contiguous chunks of the students sorted by
+    area. Label-propagation sweeps then move each student to the group with
+    the highest affinity that still has room, as long as the group it leaves
+    keeps at least min_group_size students. Each sweep is O(n * k).
+    With max_group_size = ceil(n / k) no two groups differ by more than one.
+    Returns the per-student group labels and a groups dict compatible
+    with save_interpretation_to_file.
+    """
+    n = len(students)
+    if min_group_size is None:
+        min_group_size = n // k
+    if k * max_group_size < n:
+        raise ValueError(f"{n} students do not fit in {k} groups of at most {max_group_size}")
+    if k * min_group_size > n:
+        raise ValueError(f"{n} students cannot fill {k} groups of at least {min_group_size}")
+
+    areas, area_codes = np.unique([s[area_key] for s in students], return_inverse=True)
+    order = np.argsort(area_codes, kind="stable")
+    labels = np.empty(n, dtype=np.int64)
+    labels[order] = np.arange(n) * k // n
+
+    counts = np.zeros((k, len(areas)), dtype=np.int64)
+    np.add.at(counts, (labels, area_codes), 1)
+    sizes = counts.sum(axis=1)
+
+    for _ in range(sweeps):
+        moved = 0
+        for i in range(n):
+            g, a = labels[i], area_codes[i]
+            if sizes[g] <= min_group_size:
+                continue
+            affinity = counts[:, a].astype(float)
+            # Affinity to the current group excludes the student itself
+            affinity[g] -= 1
+            affinity[(sizes >= max_group_size) & (np.arange(k) != g)] = -np.inf
+            best = int(np.argmax(affinity))
+            if best != g and affinity[best] > affinity[g] + 1e-12:
+                counts[g, a] -= 1
+                sizes[g] -= 1
+                counts[best, a] += 1
+                sizes[best] += 1
+                labels[i] = best
+                moved += 1
+        if moved == 0:
+            break
+
+    groups = {group_name(g): [] for g in range(k)}
+    for student, g in zip(students, labels):
+        groups[group_name(g)].append(student["student_id"])
+    return labels, groups
+
 def interpret_qaoa_result(result, nodes):
     """
-    Extracts the most-probable bitstring from the QAOA result,
+    Extracts the best bitstring from the QAOA result,
     maps it to student groups, and uses an AI assistant (via OpenAI)
     to provide an interpretation.
     """
-    # Assume the QAOA eigenstate is a state vector (numpy array)
-    state_vector = np.array(result.eigenstate)
-    probabilities = np.abs(state_vector)**2
-    best_index = np.argmax(probabilities)
     n = len(nodes)
-    # Convert index to bitstring with leading zeros
-    best_bitstring = format(best_index, f"0{n}b")
+    best_bitstring = best_bitstring_from_result(result, n)
     
     # Create groups based on bitstring assignment (0: Group A, 1: Group B)
     groups = {"Group A": [], "Group B": []}
@@ -140,31 +843,123 @@ def interpret_qaoa_result(result, nodes):
     interpretation = response.choices[0].message["content"]
     return best_bitstring, groups, interpretation
 
-def save_interpretation_to_file(best_bitstring, groups, interpretation, filename="interpreted_result.txt"):
+def save_interpretation_to_file(best_bitstring, groups, interpretation, filename="interpreted_result.txt",
+                                cut=None):
     """
     Saves the QAOA result interpretation and grouping details into a text file.
+    The cut value is included when given.
     """
     with open(filename, "w") as f:
         f.write("QAOA Result Interpretation\n")
         f.write("==========================\n")
-        f.write(f"Best Bitstring: {best_bitstring}\n\n")
+        f.write(f"Best Bitstring: {best_bitstring}\n")
+        if cut is not None:
+            f.write(f"Cut Value: {cut:.3f}\n")
+        f.write("\n")
         f.write("Student Groups:\n")
         f.write(json.dumps(groups, indent=2))
         f.write("\n\nInterpretation by AI Assistant:\n")
         f.write(interpretation)
     print(f"Interpretation saved to {filename}")
 
-if __name__ == "__main__":
-    # Step 1: Load student data and build the relation graph.
-    students = load_students("risks_week10.parquet")
+# --------------------------
+# Content-addressed result cache
+# --------------------------
+
+def cache_key(students, config):
+    """
+    Returns a SHA-256 key over the student records and the solver
+    configuration. Identical cohorts run with identical settings share a key
+    regardless of record order.
+    """
+    records = sorted(students, key=lambda s: str(s.get("student_id")))
+    payload = json.dumps({"records": records, "config": config}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def load_cached_run(key, cache_dir=CACHE_DIR):
+    """
+    Returns the cached run stored under key, or None on a miss.
+    A hit refreshes the entry's modification time, which acts as its
+    last-used timestamp for LRU eviction.
+    """
+    path = os.path.join(cache_dir, f"{key}.json")
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    os.utime(path)
+    return entry
+
+def store_cached_run(key, entry, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """
+    Writes a run to the cache atomically, then evicts the least recently
+    used entries until the cache fits in max_bytes.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(entry, f, default=str)
+    os.replace(tmp_path, path)
+
+    files = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith(".json")]
+    stats = sorted(((os.stat(p).st_mtime, os.stat(p).st_size, p) for p in files), reverse=True)
+    total = 0
+    for _, size, p in stats:
+        total += size
+        if total > max_bytes and p != path:
+            os.remove(p)
+
+@profiled("run_clustering_pipeline")
+def run_clustering_pipeline(filename, solver="auto", time_budget=30, use_cache=True,
+                            cache_dir=CACHE_DIR, max_cache_bytes=CACHE_MAX_BYTES):
+    """
+    Loads a risks file, solves the tutor-grouping MAXCUT, interprets it and
+    returns (best_bitstring, groups, interpretation, cut_value).
+    Runs are cached by cache_key, so an unchanged cohort with the same
+    solver settings skips the graph build, the solver and the LLM call.
+    """
+    students = load_students(filename)
+    key = cache_key(students, {"solver": solver, "time_budget": time_budget})
+    if use_cache:
+        cached = load_cached_run(key, cache_dir)
+        if cached is not None:
+            print(f"Loaded cached clustering result {key[:12]}")
+            return (cached["best_bitstring"], cached["groups"],
+                    cached["interpretation"], cached["cut_value"])
+
     G = build_graph(students)
-    
-    # Step 2: Run QAOA to solve the MAXCUT problem.
-    result = run_qaoa(G)
-    nodes = list(G.nodes)
-    
-    # Step 3: Interpret the QAOA result using the AI assistant.
-    best_bitstring, groups, interpretation = interpret_qaoa_result(result, nodes)
+    result = solve_maxcut(G, solver=solver, time_budget=time_budget)
+    nodes, W = graph_to_weight_matrix(G)
+    if "qaoa_result" in result.info:
+        print("Top sampled bitstrings:")
+        for sample in top_k_bitstrings(result.info["qaoa_result"], W, k=5):
+            print(f"  {sample['bitstring']}  p={sample['probability']:.4f}  cut={sample['cut_value']:.3f}")
+
+    # Nodes may be integer codes; reports always show the student IDs
+    labels = [G.nodes[node]["student_id"] for node in nodes]
+    best_bitstring, groups, interpretation = interpret_qaoa_result(result, labels)
+    if use_cache:
+        store_cached_run(key, {
+            "solver": result.solver,
+            "cut_value": result.cut_value,
+            "assignment": result.assignment.tolist(),
+            "best_bitstring": best_bitstring,
+            "groups": groups,
+            "interpretation": interpretation,
+        }, cache_dir, max_cache_bytes)
+    return best_bitstring, groups, interpretation, result.cut_value
+
+if __name__ == "__main__":
+    # Steps 1-3: Load the students, solve the MAXCUT problem ("auto" picks a
+    # backend by graph size; use "qaoa" to force the quantum solver) and
+    # interpret the grouping. Unchanged cohorts are served from the cache.
+    best_bitstring, groups, interpretation, cut = run_clustering_pipeline(
+        "risks_week10.parquet", solver="auto", time_budget=30
+    )
     
     # Step 4: Save the interpretation to a new file.
-    save_interpretation_to_file(best_bitstring, groups, interpretation)
+    save_interpretation_to_file(best_bitstring, groups, interpretation, cut=cut)
+    print_summary()
+    write_run_report()
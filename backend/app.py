@@ -1,16 +1,36 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-import pandas as pd
+
+from data_lake import list_partitions, query
+from parquet_loader import load_risks
+from risk_ranking import top_k_riskiest
+from student_ids import STUDENT_CODE_COLUMN
 
 app = Flask(__name__)
 CORS(app)
 
 @app.route('/api/students', methods=['GET'])
 def get_students():
-    # Read the parquet file for at-risk students
-    at_risk_df = pd.read_parquet('src/risks_week10.parquet')
-    at_risk_students = at_risk_df.to_dict(orient='records')
+    # Served from the data lake once predict_risk has written week 10 there,
+    # otherwise from the legacy parquet file
+    if list_partitions('risks', weeks=10):
+        at_risk_df = query('risks', weeks=10)
+    else:
+        at_risk_df = load_risks('src/risks_week10.parquet')
+    # student_code is internal; clients identify students by student_id
+    at_risk_students = at_risk_df.drop(columns=[STUDENT_CODE_COLUMN], errors='ignore').to_dict(orient='records')
     return jsonify(at_risk_students)
 
+@app.route('/api/students/top', methods=['GET'])
+def get_top_students():
+    # The k riskiest students per course and week, e.g. ?k=20&course=CS182&week=10
+    k = request.args.get('k', 20, type=int)
+    if k < 1:
+        return jsonify({'error': 'k must be at least 1'}), 400
+    course = request.args.get('course')
+    week = request.args.get('week', type=int)
+    top = top_k_riskiest('src/risks_week10.parquet', k, course, week)
+    return jsonify(top.drop(columns=[STUDENT_CODE_COLUMN], errors='ignore').to_dict(orient='records'))
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,232 @@
+import argparse
+import importlib.util
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from profiling import peak_rss_mb
+from threshold_index import DEFAULT_THRESHOLD
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# Appended, so backend/app.py still shadows src/app.py
+sys.path.append(os.path.join(BACKEND_DIR, "..", "make2025"))
+sys.path.append(os.path.join(BACKEND_DIR, "src"))
+
+# Cohort sizes, in student-course-week rows
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+BASELINE_FILE = os.path.join(BACKEND_DIR, "benchmark_baseline.json")
+RESULTS_FILE = "benchmark_results.json"
+
+# Rows each generator emits per student (courses x weeks)
+CURRENT_ROWS_PER_STUDENT = 2 * 15
+HISTORY_ROWS_PER_STUDENT = 3 * 15
+CURRENT_WEEK = 10
+
+# Quadratic stages are capped so the largest cohorts stay measurable
+CLUSTER_MAX_NODES = 1000
+OPERATOR_MAX_NODES = 200
+KERNEL_MAX_SAMPLES = 4000
+# The PennyLane fallback simulates every sample, so it gets a smaller cap
+PENNYLANE_MAX_SAMPLES = 1000
+
+# A benchmark regresses when it is this much slower than its baseline...
+REGRESSION_TOLERANCE = 1.5
+# ...and slower by at least this many seconds, so tiny timings don't flap
+MIN_REGRESSION_SECONDS = 0.05
+
+def timed(func, repeats=1):
+    """Runs func repeats times; returns (best wall seconds, last return value)."""
+    best, result = math.inf, None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def get_ok(client, url):
+    """GETs url from a Flask test client, failing the benchmark on any error response."""
+    response = client.get(url)
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {url} returned {response.status_code}")
+    return response.get_json()
+
+def load_src_app(risks_dir):
+    """
+    Imports a fresh copy of src/app.py serving the files in risks_dir. It
+    is loaded by path since backend/app.py owns the module name "app".
+    """
+    os.environ["RISKS_DIR"] = risks_dir
+    try:
+        spec = importlib.util.spec_from_file_location("src_app", os.path.join(BACKEND_DIR, "src", "app.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        del os.environ["RISKS_DIR"]
+    return module
+
+def run_size(label, rows, only=None, repeats=None):
+    """
+    Runs every benchmark for one cohort size inside a scratch directory, since
+    the pipeline scripts read and write fixed file names in the working
+    directory. Returns {benchmark: {"seconds", "rows", "peak_rss_mb"}}.
+    """
+    repeats = repeats or (3 if rows <= 10_000 else 1)
+    results = {}
+
+    def selected(*names):
+        return not only or any(name in only for name in names)
+
+    def bench(name, func, bench_rows, bench_repeats=repeats, required=False):
+        # Deselected steps still run, untimed, when later benchmarks need them
+        if only and name not in only:
+            return func() if required else None
+        seconds, value = timed(func, bench_repeats)
+        results[name] = {"seconds": round(seconds, 6), "rows": int(bench_rows),
+                         "peak_rss_mb": round(peak_rss_mb(), 2)}
+        print(f"  {label:>5} {name:<30}{seconds:>10.3f}s  rows={bench_rows}")
+        return value
+
+    workdir = tempfile.mkdtemp(prefix=f"benchmark_{label}_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from half_data_generator import generate_student_grades, save_to_parquet
+        from complete_data_generator import generate_complete_student_data
+        from train_model import train_proper_model
+        from predict_risk import get_accurate_risks
+
+        current_students = max(1, math.ceil(rows / CURRENT_ROWS_PER_STUDENT))
+        history_students = max(1, math.ceil(rows / HISTORY_ROWS_PER_STUDENT))
+
+        # Data generation always runs, since every later stage reads its output
+        grades = bench("generate_grades", lambda: generate_student_grades(
+            num_students=current_students, current_week=CURRENT_WEEK), rows, 1, required=True)
+        save_to_parquet(grades)
+        bench("generate_history", lambda: generate_complete_student_data(
+            num_students=history_students), rows, 1, required=True)
+        bench("train", train_proper_model, rows, 1, required=True)
+
+        week_rows = current_students * 2
+        bench("score_all_weeks", lambda: [get_accurate_risks(week, DEFAULT_THRESHOLD)
+                                          for week in range(1, CURRENT_WEEK + 1)], week_rows * CURRENT_WEEK)
+        risks = bench("score_single_week", lambda: get_accurate_risks(CURRENT_WEEK, DEFAULT_THRESHOLD), week_rows,
+                      required=True)
+
+        # Skipped when no student crossed the threshold at this size
+        have_risks = os.path.exists(f"risks_week{CURRENT_WEEK}.parquet")
+        at_risk = len(risks) if risks is not None else 0
+        if have_risks and selected("api_students"):
+            # backend/app.py serves src/risks_week10.parquet relative to its cwd
+            os.makedirs("src", exist_ok=True)
+            shutil.copy(f"risks_week{CURRENT_WEEK}.parquet", os.path.join("src", f"risks_week{CURRENT_WEEK}.parquet"))
+            from app import app
+            client = app.test_client()
+            bench("api_students", lambda: get_ok(client, "/api/students"), at_risk)
+
+        if have_risks and selected("api_top_risks", "api_risk_threshold", "api_student_grades_threshold"):
+            client = load_src_app(workdir).app.test_client()
+            bench("api_top_risks", lambda: get_ok(client, "/api/top-risks?k=20"), at_risk)
+            bench("api_risk_threshold", lambda: get_ok(
+                client, f"/api/risk-threshold?threshold={DEFAULT_THRESHOLD}"), week_rows)
+            bench("api_student_grades_threshold", lambda: get_ok(
+                client, "/api/student-grades?threshold=0.5"), at_risk)
+
+        if have_risks and selected("build_graph", "maxcut_operator"):
+            from QAOA_clustering import build_graph, get_maxcut_operator, load_students
+            students = load_students(f"risks_week{CURRENT_WEEK}.parquet")[:CLUSTER_MAX_NODES]
+            G = bench("build_graph", lambda: build_graph(students), len(students), required=True)
+            sub = G.subgraph(list(G.nodes)[:OPERATOR_MAX_NODES])
+            bench("maxcut_operator", lambda: get_maxcut_operator(sub), len(sub))
+
+        if selected("statevectors_fast", "statevectors_pennylane", "quantum_kernel", "quantum_kernel_cached"):
+            from kernel_cache import cached_kernel_matrix
+            from qsvm_kernel import compute_kernel_matrix, compute_statevectors
+            samples = min(rows, KERNEL_MAX_SAMPLES)
+            X = np.random.default_rng(0).uniform(-np.pi, np.pi, size=(samples, 2))
+            bench("statevectors_fast", lambda: compute_statevectors(X, fast=True), samples)
+            bench("statevectors_pennylane", lambda: compute_statevectors(
+                X[:PENNYLANE_MAX_SAMPLES], fast=False), min(samples, PENNYLANE_MAX_SAMPLES))
+            # A fresh feature map key per call keeps every repeat uncached
+            bench("quantum_kernel", lambda: cached_kernel_matrix(
+                X, X, compute_statevectors, f"benchmark-{time.perf_counter_ns()}",
+                cache_dir=os.path.join(workdir, "kernel_cache")), samples)
+            # QSVM's own entry point, reopening the matrix from its cache
+            if selected("quantum_kernel_cached"):
+                compute_kernel_matrix(X, X)
+            bench("quantum_kernel_cached", lambda: compute_kernel_matrix(X, X), samples)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def run_benchmarks(sizes=tuple(SIZES), only=None, repeats=None):
+    """Runs the suite for the given size labels and returns a results document."""
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "results": {},
+    }
+    for label in sizes:
+        print(f"Benchmarking {label} ({SIZES[label]} student-course-weeks)")
+        report["results"][label] = run_size(label, SIZES[label], only, repeats)
+    return report
+
+def compare_to_baseline(report, baseline, tolerance=REGRESSION_TOLERANCE,
+                        min_seconds=MIN_REGRESSION_SECONDS):
+    """
+    Returns the benchmarks slower than tolerance x their baseline time, as
+    (size, benchmark, baseline seconds, current seconds). Benchmarks missing
+    from either document are ignored.
+    """
+    regressions = []
+    for label, benches in report["results"].items():
+        for name, current in benches.items():
+            previous = baseline.get("results", {}).get(label, {}).get(name)
+            if previous is None:
+                continue
+            if (current["seconds"] > previous["seconds"] * tolerance
+                    and current["seconds"] - previous["seconds"] >= min_seconds):
+                regressions.append((label, name, previous["seconds"], current["seconds"]))
+    return regressions
+
+def save_report(report, path):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark results saved to {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling benchmarks for the risk pipeline")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--only", nargs="+", help="Benchmark names to run (default: all)")
+    parser.add_argument("--repeats", type=int, help="Timing repeats per benchmark")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store these results as the new baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.only, args.repeats)
+    save_report(report, RESULTS_FILE)
+
+    if args.save_baseline:
+        save_report(report, args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        for label, name, before, after in regressions:
+            print(f"REGRESSION {label}/{name}: {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline on this machine "
+              f"to create one (see README.md)")
@@ -0,0 +1,170 @@
+import json
+import numbers
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from student_ids import ID_DICTIONARY_NAME, STUDENT_CODE_COLUMN, add_student_codes, decode_students
+
+# Root directory of the on-disk data lake. Each table is a Hive-partitioned
+# dataset: <root>/<table>/course_name=<course>/week=<week>/data.parquet
+DATA_LAKE_ROOT = "data_lake"
+# Completed past terms used for training live in their own lake
+HISTORY_ROOT = os.path.join(DATA_LAKE_ROOT, "history")
+TABLES = ("grades", "features", "risks")
+PARTITION_SCHEMA = pa.schema([("course_name", pa.string()), ("week", pa.int8())])
+MANIFEST_NAME = "_manifest.json"
+ROW_GROUP_SIZE = 64 * 1024
+
+def table_dir(table, root=DATA_LAKE_ROOT):
+    """Returns the directory of one table, validating its name."""
+    if table not in TABLES:
+        raise ValueError(f"Unknown table '{table}'. Choose from: {', '.join(TABLES)}")
+    return os.path.join(root, table)
+
+def partition_path(course_name, week):
+    """Relative Hive path of one partition's data file."""
+    return os.path.join(f"course_name={course_name}", f"week={int(week)}", "data.parquet")
+
+def read_manifest(table, root=DATA_LAKE_ROOT):
+    """
+    Returns a table's manifest:
+    {"partitions": {relative path: {"course_name", "week", "rows", "bytes", "written_at", "stats"}}}
+    """
+    path = os.path.join(table_dir(table, root), MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"partitions": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def _write_json_atomic(path, payload):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+def _column_stats(table):
+    """Min/max of each numeric column, kept in the manifest for quick slicing."""
+    stats = {}
+    for name in table.column_names:
+        column = table[name]
+        if pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+            min_max = pc.min_max(column).as_py()
+            stats[name] = {"min": min_max["min"], "max": min_max["max"]}
+    return stats
+
+def write_partition(table, df, course_name, week, root=DATA_LAKE_ROOT, row_group_size=ROW_GROUP_SIZE):
+    """
+    Writes (or overwrites) one course/week partition of a table atomically.
+
+    The partition columns are dropped from the file and restored from the
+    path on read. Data goes to a temporary file in the partition directory
+    and is moved into place with os.replace, so readers see either the old
+    or the new partition, never a partial file. Row groups carry min/max
+    statistics for predicate pushdown, and the manifest is updated afterwards.
+    Students are stored as int32 student_code only, encoded against the
+    ID dictionary at the lake root (codes from other dictionaries are
+    replaced); query decodes them.
+    """
+    base = table_dir(table, root)
+    if 'student_id' in df.columns:
+        os.makedirs(root, exist_ok=True)
+        df = add_student_codes(df, os.path.join(root, ID_DICTIONARY_NAME)).drop(columns=['student_id'])
+    relative = partition_path(course_name, week)
+    target = os.path.join(base, relative)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    data = df.drop(columns=[c for c in ("course_name", "week") if c in df.columns])
+    arrow_table = pa.Table.from_pandas(data, preserve_index=False)
+    tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    pq.write_table(arrow_table, tmp_path, compression="snappy",
+                   row_group_size=row_group_size, write_statistics=True)
+    os.replace(tmp_path, target)
+
+    manifest = read_manifest(table, root)
+    manifest["partitions"][relative] = {
+        "course_name": str(course_name),
+        "week": int(week),
+        "rows": arrow_table.num_rows,
+        "bytes": os.path.getsize(target),
+        "written_at": datetime.now(timezone.utc).isoformat(),
+        "stats": _column_stats(arrow_table),
+    }
+    _write_json_atomic(os.path.join(base, MANIFEST_NAME), manifest)
+    return target
+
+def write_table(table, df, root=DATA_LAKE_ROOT):
+    """Splits a DataFrame by course_name and week and writes every partition."""
+    if 'student_id' in df.columns:
+        # Encode once for the whole table rather than per partition
+        os.makedirs(root, exist_ok=True)
+        df = add_student_codes(df, os.path.join(root, ID_DICTIONARY_NAME)).drop(columns=['student_id'])
+    written = []
+    for (course_name, week), part in df.groupby(["course_name", "week"], observed=True, sort=True):
+        written.append(write_partition(table, part, course_name, week, root))
+    return written
+
+def list_partitions(table, courses=None, weeks=None, root=DATA_LAKE_ROOT):
+    """Relative paths of the partitions matching the given courses and weeks."""
+    partitions = read_manifest(table, root)["partitions"]
+    courses = None if courses is None else {str(c) for c in ([courses] if isinstance(courses, str) else courses)}
+    # numbers.Integral also covers NumPy integers such as np.int64
+    weeks = None if weeks is None else {int(w) for w in ([weeks] if isinstance(weeks, numbers.Integral) else weeks)}
+    return sorted(
+        relative for relative, entry in partitions.items()
+        if (courses is None or entry["course_name"] in courses)
+        and (weeks is None or entry["week"] in weeks)
+    )
+
+def query(table, courses=None, weeks=None, columns=None, filter=None, root=DATA_LAKE_ROOT):
+    """
+    Reads a slice of a table into pandas.
+
+    Partitions are chosen from the manifest, so only the matching course/week
+    files are opened. columns projects the read, and filter (a
+    pyarrow.dataset expression) is pushed down to row groups via their
+    statistics. course_name and week are always present in the result.
+    student_id is decoded from student_code on the way out (filters must
+    use student_code).
+    """
+    base = table_dir(table, root)
+    files = [os.path.join(base, relative) for relative in list_partitions(table, courses, weeks, root)]
+    if not files:
+        return pd.DataFrame(columns=list(columns) if columns else ["course_name", "week"])
+    dataset = ds.dataset(files, format="parquet", partition_base_dir=base,
+                         partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"))
+    if columns:
+        columns = [STUDENT_CODE_COLUMN if c == 'student_id' else c for c in columns]
+        columns = list(dict.fromkeys(columns + ["course_name", "week"]))
+    df = dataset.to_table(columns=columns, filter=filter).to_pandas()
+    if STUDENT_CODE_COLUMN in df.columns:
+        df = decode_students(df, os.path.join(root, ID_DICTIONARY_NAME))
+    return df
+
+def import_file(table, path, root=DATA_LAKE_ROOT):
+    """Loads one of the legacy monolithic Parquet files into the lake."""
+    df = pd.read_parquet(path)
+    written = write_table(table, df, root)
+    print(f"Imported {path} into {table}: {len(written)} partitions")
+    return written
+
+if __name__ == "__main__":
+    # Migrate the legacy per-week files into the partitioned layout
+    legacy_files = [
+        ("grades", "src/complete_student_grades.parquet", HISTORY_ROOT),
+        ("grades", "src/student_grades.parquet", DATA_LAKE_ROOT),
+        ("risks", "risks_week10.parquet", DATA_LAKE_ROOT),
+        ("features", "../hmm/at_risk_week_5_CS182.parquet", DATA_LAKE_ROOT),
+        ("features", "../hmm/at_risk_week_10_CS182.parquet", DATA_LAKE_ROOT),
+    ]
+    for table, path, root in legacy_files:
+        if os.path.exists(path):
+            import_file(table, path, root)
+
+    print(query("risks", courses="CS182", weeks=10).head())
@@ -1,29 +1,88 @@
-import pandas as pd
+import numbers
 
-def process_student_data(week: int, risks_file: str, student_grades_file: str, output_file: str):
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+def read_at_risk_ids(risks_files, key='student_id'):
+    """
+    Reads only the key column (student_id, or the int32 student_code) of
+    one or more risks files and returns the distinct values as an Arrow
+    array, used as the hashed probe set.
+    """
+    if isinstance(risks_files, str):
+        risks_files = [risks_files]
+    key_type = pa.int32() if key == 'student_code' else pa.string()
+    chunks = [chunk
+              for path in risks_files
+              for chunk in pq.read_table(path, columns=[key])[key].cast(key_type).chunks]
+    return pc.unique(pa.chunked_array(chunks, type=key_type))
+
+def join_key(risks_files, grades_schema):
+    """
+    Joins on the integer student_code when the grades and every risks file
+    carry it, falling back to the student_id strings otherwise.
+    """
+    if isinstance(risks_files, str):
+        risks_files = [risks_files]
+    coded = 'student_code' in grades_schema.names and all(
+        'student_code' in pq.read_schema(path).names for path in risks_files)
+    return 'student_code' if coded else 'student_id'
+
+def process_student_data(week, risks_file, student_grades_file: str, output_file: str,
+                         batch_size: int = 65536):
     """
     Reads at-risk student IDs, filters student grades, and saves to a new Parquet file.
 
+    The grades are streamed batch by batch through the pyarrow dataset API:
+    the week predicate is pushed down to the reader, each batch is probed
+    against the hashed set of at-risk IDs, and surviving rows are written
+    straight to the output, so memory stays bounded by batch_size.
+
     Args:
-        week (int): The week to filter student grades by.
-        risks_file (str): Path to the Parquet file containing at-risk student data.
-        student_grades_file (str): Path to the main student grades Parquet file.
+        week (int or list): The week (or weeks, in one pass) to filter student grades by.
+        risks_file (str or list): Parquet file(s) containing at-risk student data;
+            a student flagged in any of them is excluded.
+        student_grades_file (str): Path to the main student grades Parquet file (or dataset directory).
         output_file (str): Path to save the filtered student grades Parquet file.
+        batch_size (int): Maximum rows per streamed batch.
     """
     try:
+        # numbers.Integral also covers NumPy integers such as np.int64
+        weeks = [int(week)] if isinstance(week, numbers.Integral) else [int(w) for w in week]
+        grades = ds.dataset(student_grades_file, format="parquet")
+        key = join_key(risks_file, grades.schema)
+
         # Read at-risk student IDs
-        risks_df = pd.read_parquet(risks_file)
-        at_risk_student_ids = risks_df['student_id'].unique()
+        at_risk_student_ids = read_at_risk_ids(risks_file, key)
+        week_type = grades.schema.field('week').type
+        week_filter = pc.field('week').isin(pa.array(weeks, type=week_type))
 
-        # Read student grades, filtering out at-risk students and non-target week
-        all_grades_df = pd.read_parquet(student_grades_file)
-        filtered_grades = all_grades_df[
-            (~all_grades_df['student_id'].isin(at_risk_student_ids)) & (all_grades_df['week'] == week)
-        ]
+        writer = None
+        rows_written = 0
+        try:
+            for batch in grades.to_batches(filter=week_filter, batch_size=batch_size):
+                student_ids = batch.column(key)
+                if pa.types.is_dictionary(student_ids.type):
+                    student_ids = student_ids.cast(pa.string())
+                elif key == 'student_code':
+                    student_ids = student_ids.cast(pa.int32())
+                keep = pc.invert(pc.is_in(student_ids, value_set=at_risk_student_ids))
+                good = batch.filter(keep)
+                if good.num_rows == 0:
+                    continue
+                if writer is None:
+                    writer = pq.ParquetWriter(output_file, good.schema, compression='snappy')
+                writer.write_batch(good)
+                rows_written += good.num_rows
+            if writer is None:
+                pq.write_table(grades.schema.empty_table(), output_file)
+        finally:
+            if writer is not None:
+                writer.close()
 
-        # Save filtered grades to a new Parquet file
-        filtered_grades.to_parquet(output_file)
-        print(f"Filtered student grades saved to {output_file}")
+        print(f"Filtered student grades saved to {output_file} ({rows_written} rows)")
 
     except FileNotFoundError:
         print("Error: One or both input files not found.")
@@ -36,4 +95,4 @@ if __name__ == "__main__":
     student_grades_file = "student_grades.parquet"
     output_file = f"filtered_student_grades_week{week}.parquet"
 
-    process_student_data(week, risks_file, student_grades_file, output_file)
\ No newline at end of file
+    process_student_data(week, risks_file, student_grades_file, output_file)
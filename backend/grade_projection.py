@@ -0,0 +1,187 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from half_data_generator import COURSES
+from parquet_loader import load_grades
+from profiling import print_summary, profiled, stage, write_run_report
+from student_ids import student_keys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "make2025"))
+from complete_data_generator import COURSE_WEIGHTS
+
+DEFAULT_SCENARIOS = 2000
+DEFAULT_PERCENTILES = (10, 50, 90)
+# Spread used when a student has fewer than two grades of a kind
+DEFAULT_SD = 10.0
+# Exams vary more than the coursework they are predicted from
+EXAM_EXTRA_SD = 10.0
+# Upper bound on the scenario tensor of one batch of students
+MAX_BATCH_BYTES = 64 * 1024 * 1024
+
+def course_config(course_name):
+    """
+    Grading scheme of a course: schedules, weights (in %) and pass mark.
+    Courses from half_data_generator.COURSES use their own schedules, and
+    the part of the grade not covered by homework, quizzes and the midterm
+    ('exam_weight') is the final. Any other course uses
+    complete_data_generator's COURSE_WEIGHTS over weekly homework and
+    quizzes, a week-8 midterm and a 60% pass mark.
+    """
+    if course_name in COURSES:
+        config = COURSES[course_name]
+        weights = {
+            'homework': config['homework_weight'],
+            'quizzes': config['quiz_weight'],
+            'midterm': config['exam_weight'],
+        }
+        weights['final'] = 100 - sum(weights.values())
+        return {
+            'weeks': config['weeks'],
+            'homework_weeks': sorted(config['homework_schedule']),
+            'quiz_weeks': sorted(config['quiz_schedule']),
+            'midterm_week': config['midterm_week'],
+            'weights': weights,
+            'passing_percentage': config['passing_percentage'],
+        }
+    return {
+        'weeks': 15,
+        'homework_weeks': list(range(1, 16)),
+        'quiz_weeks': list(range(1, 16)),
+        'midterm_week': 8,
+        'weights': {name: weight * 100 for name, weight in COURSE_WEIGHTS.items()},
+        'passing_percentage': 60,
+    }
+
+def observed_stats(grades, current_week):
+    """
+    Per student and course, from grades up to current_week: count, sum and
+    standard deviation of homework and quiz grades, and the midterm if taken.
+    """
+    observed = grades[grades['week'] <= current_week].copy()
+    observed['student_key'] = student_keys(observed)
+    stats = observed.groupby(['student_key', 'course_name'], observed=True).agg(
+        student_id=('student_id', 'first'),
+        hw_count=('homework_grade', 'count'),
+        hw_sum=('homework_grade', 'sum'),
+        hw_sd=('homework_grade', 'std'),
+        quiz_count=('quiz_grade', 'count'),
+        quiz_sum=('quiz_grade', 'sum'),
+        quiz_sd=('quiz_grade', 'std'),
+        midterm=('midterm_grade', 'max'),
+    ).reset_index()
+    return stats
+
+def _mean(total, count, fallback):
+    return np.where(count > 0, total / np.maximum(count, 1), fallback)
+
+def simulate_course(stats, config, current_week, n_scenarios, rng):
+    """
+    Simulates n_scenarios final grades for every student of one course at
+    once. Returns an array of shape (students, n_scenarios).
+
+    Each remaining homework and quiz is drawn from the student's own
+    observed mean and spread (clipped to 0-100), so the projected averages
+    combine the real grades with the simulated ones. Exams not yet sat are
+    drawn around the student's quiz mean (averaged with the midterm once it
+    is known) with EXAM_EXTRA_SD of extra spread. The weighted total is the
+    final grade.
+    """
+    n = len(stats)
+    hw_count = stats['hw_count'].to_numpy(dtype=float)
+    quiz_count = stats['quiz_count'].to_numpy(dtype=float)
+    hw_mean = _mean(stats['hw_sum'].to_numpy(dtype=float), hw_count, 75.0)
+    quiz_mean = _mean(stats['quiz_sum'].to_numpy(dtype=float), quiz_count, 75.0)
+    hw_sd = np.nan_to_num(stats['hw_sd'].to_numpy(dtype=float), nan=DEFAULT_SD)
+    quiz_sd = np.nan_to_num(stats['quiz_sd'].to_numpy(dtype=float), nan=DEFAULT_SD)
+    midterm = stats['midterm'].to_numpy(dtype=float)
+
+    remaining_hw = sum(week > current_week for week in config['homework_weeks'])
+    remaining_quiz = sum(week > current_week for week in config['quiz_weeks'])
+    weights = config['weights']
+
+    finals = np.empty((n, n_scenarios))
+    per_student = n_scenarios * (remaining_hw + remaining_quiz + 2) * 8
+    batch = max(1, MAX_BATCH_BYTES // max(per_student, 1))
+    for start in range(0, n, batch):
+        s = slice(start, min(start + batch, n))
+        m = s.stop - s.start
+
+        def future_average(count, total, mean, sd, remaining):
+            # (students, scenarios, remaining) draws, clipped like real grades
+            draws = rng.normal(mean[s, None, None], sd[s, None, None], size=(m, n_scenarios, remaining))
+            future = np.clip(draws, 0, 100).sum(axis=2)
+            total_count = count[s, None] + remaining
+            return (total[s, None] + future) / np.maximum(total_count, 1)
+
+        hw_total = hw_mean * hw_count
+        quiz_total = quiz_mean * quiz_count
+        homework = future_average(hw_count, hw_total, hw_mean, hw_sd, remaining_hw)
+        quizzes = future_average(quiz_count, quiz_total, quiz_mean, quiz_sd, remaining_quiz)
+
+        exam_sd = np.sqrt(quiz_sd[s] ** 2 + EXAM_EXTRA_SD ** 2)[:, None]
+        # Students who missed a past midterm are simulated like future ones
+        simulated_midterm = np.clip(rng.normal(quiz_mean[s, None], exam_sd, size=(m, n_scenarios)), 0, 100)
+        mid = np.where(np.isnan(midterm[s])[:, None], simulated_midterm, midterm[s, None])
+        final_mean = np.where(np.isnan(midterm[s]), quiz_mean[s], (quiz_mean[s] + midterm[s]) / 2)[:, None]
+        final_exam = np.clip(rng.normal(final_mean, exam_sd, size=(m, n_scenarios)), 0, 100)
+
+        finals[s] = (homework * weights['homework'] + quizzes * weights['quizzes']
+                     + mid * weights['midterm'] + final_exam * weights['final']) / 100
+    return finals
+
+@profiled("project_final_grades")
+def project_final_grades(grades, current_week=None, n_scenarios=DEFAULT_SCENARIOS,
+                         percentiles=DEFAULT_PERCENTILES, seed=42):
+    """
+    Monte Carlo projection of every student's final grade in every course.
+
+    Args:
+        grades (DataFrame): Weekly grades (student_grades.parquet layout).
+        current_week (int): Last week of observed grades; defaults to the
+            latest week with any homework, quiz or midterm grade.
+        n_scenarios (int): Simulated remaining terms per student.
+        percentiles (tuple): Final-grade percentiles to report.
+        seed (int): Random seed.
+
+    Returns:
+        DataFrame with student_id, course_name, current_week,
+        pass_probability, expected_grade and one p<q> column per percentile.
+    """
+    rng = np.random.default_rng(seed)
+    if current_week is None:
+        graded = grades[['homework_grade', 'quiz_grade', 'midterm_grade']].notna().any(axis=1)
+        current_week = int(grades.loc[graded, 'week'].max())
+
+    with stage("observed_stats", rows=len(grades)):
+        stats = observed_stats(grades, current_week)
+
+    results = []
+    for course_name, course_stats in stats.groupby('course_name', observed=True):
+        config = course_config(course_name)
+        with stage(f"simulate_{course_name}", rows=len(course_stats)):
+            finals = simulate_course(course_stats.reset_index(drop=True), config, current_week, n_scenarios, rng)
+        projection = pd.DataFrame({
+            'student_id': course_stats['student_id'].to_numpy(),
+            'course_name': course_name,
+            'current_week': current_week,
+            'pass_probability': (finals >= config['passing_percentage']).mean(axis=1),
+            'expected_grade': finals.mean(axis=1),
+        })
+        for q, values in zip(percentiles, np.percentile(finals, percentiles, axis=1)):
+            projection[f'p{q}'] = values
+        results.append(projection)
+    if not results:
+        return pd.DataFrame()
+    return pd.concat(results, ignore_index=True)
+
+if __name__ == "__main__":
+    week = 10
+    grades = load_grades("student_grades.parquet")
+    projection = project_final_grades(grades, current_week=week)
+    projection.to_parquet(f"grade_projection_week{week}.parquet", index=False)
+    print(projection.sort_values('pass_probability').head(10).to_string(index=False))
+    print_summary()
+    write_run_report()
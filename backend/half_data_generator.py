@@ -5,6 +5,32 @@ import h5py
 import pyarrow as pa
 import pyarrow.parquet as pq
 
+from student_ids import add_student_codes, dictionary_path
+
+# Course configurations, also used by grade_projection
+COURSES = {
+    'CS182': {
+        'weeks': 15,  # Total weeks in semester
+        'homework_schedule': {week: f'HW{week}' for week in range(1, 12)},  # One HW per week
+        'quiz_schedule': {week: f'Q{week}' for week in range(1, 13)},       # One quiz per week
+        'midterm_week': 8,  # Midterm in week 8
+        'homework_weight': 25,
+        'quiz_weight': 10,
+        'exam_weight': 30,
+        'passing_percentage': 60
+    },
+    'MA261': {
+        'weeks': 15,
+        'homework_schedule': {week: f'HW{week}' for week in range(1, 11)},
+        'quiz_schedule': {week: f'Q{week}' for week in range(1, 9)},
+        'midterm_week': 7,
+        'homework_weight': 20,
+        'quiz_weight': 15,
+        'exam_weight': 35,
+        'passing_percentage': 65
+    }
+}
+
 def generate_student_grades(num_students=50, current_week=10, seed=42):
     """
     Generate synthetic student grade data with a time-based structure,
@@ -12,29 +38,7 @@ def generate_student_grades(num_students=50, current_week=10, seed=42):
     """
     np.random.seed(seed)
     
-    # Course configurations
-    courses = {
-        'CS182': {
-            'weeks': 15,  # Total weeks in semester
-            'homework_schedule': {week: f'HW{week}' for week in range(1, 12)},  # One HW per week
-            'quiz_schedule': {week: f'Q{week}' for week in range(1, 13)},       # One quiz per week
-            'midterm_week': 8,  # Midterm in week 8
-            'homework_weight': 25,
-            'quiz_weight': 10,
-            'exam_weight': 30,
-            'passing_percentage': 60
-        },
-        'MA261': {
-            'weeks': 15,
-            'homework_schedule': {week: f'HW{week}' for week in range(1, 11)},
-            'quiz_schedule': {week: f'Q{week}' for week in range(1, 9)},
-            'midterm_week': 7,
-            'homework_weight': 20,
-            'quiz_weight': 15,
-            'exam_weight': 35,
-            'passing_percentage': 65
-        }
-    }
+    courses = COURSES
 
     all_records = []
     
@@ -118,6 +122,10 @@ def save_to_parquet(df, filename='student_grades.parquet'):
     - Schema preservation
     - Faster read/write for large datasets
     """
+    # Encode student IDs to dense int32 codes once, at ingestion; the ID
+    # dictionary is saved next to the file, on every run like the data itself
+    df = add_student_codes(df, dictionary_path(filename), rewrite=True)
+    
     # Convert to PyArrow Table
     table = pa.Table.from_pandas(df)
     
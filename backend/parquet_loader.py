@@ -0,0 +1,117 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Declared column types for the tables shared across the pipeline.
+# "category" columns are read as dictionary-encoded Arrow strings and become
+# pandas Categoricals; numeric columns are cast in Arrow before conversion so
+# no script has to re-cast after loading.
+GRADES_SCHEMA = {
+    'student_id': 'category',
+    'student_code': 'int32',
+    'course_name': 'category',
+    'week': 'int8',
+    'homework_grade': 'float32',
+    'quiz_grade': 'float32',
+    'midterm_grade': 'float32',
+    'final_exam_grade': 'float32',
+    'homework_avg': 'float32',
+    'quiz_avg': 'float32',
+    'current_grade': 'float32',
+    'final_grade': 'float32',
+    'final_outcome': 'category',
+    'failing_probability': 'float32',
+}
+GRADES_REQUIRED = ['student_id', 'course_name', 'week', 'homework_avg', 'quiz_avg', 'current_grade']
+
+RISKS_SCHEMA = {
+    'student_id': 'category',
+    'student_code': 'int32',
+    'course_name': 'category',
+    'week': 'int8',
+    'failure_prob': 'float32',
+    'weakest_area': 'category',
+    'area_score': 'float32',
+    'homework_avg': 'float32',
+    'quiz_avg': 'float32',
+    'current_grade': 'float32',
+    'weakness_summary': 'string',
+}
+RISKS_REQUIRED = ['student_id', 'course_name', 'week', 'failure_prob']
+
+ARROW_TYPES = {
+    'category': pa.dictionary(pa.int32(), pa.string()),
+    'int8': pa.int8(),
+    'int32': pa.int32(),
+    'float32': pa.float32(),
+    'string': pa.string(),
+}
+
+# pandas index columns written by DataFrame.to_parquet; never part of the data
+IGNORED_COLUMNS = {'__index_level_0__'}
+
+class SchemaError(ValueError):
+    """Raised when a Parquet file does not match its declared schema."""
+
+def _compatible(arrow_type, kind):
+    """Whether a column stored as arrow_type can be read as the declared kind."""
+    if pa.types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+    if pa.types.is_null(arrow_type):
+        return True
+    if kind in ('category', 'string'):
+        return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+    if kind in ('int8', 'int32'):
+        return pa.types.is_integer(arrow_type)
+    # float32 also accepts integers and all-null columns
+    return pa.types.is_floating(arrow_type) or pa.types.is_integer(arrow_type)
+
+def load_table(path, schema, required, columns=None, filters=None, strict=False):
+    """
+    Reads a Parquet file into pandas with the declared column types.
+
+    Args:
+        path (str): Parquet file (or dataset directory) to read.
+        schema (dict): Column name -> declared kind ("category", "int8",
+            "int32", "float32" or "string").
+        required (list): Columns that must exist in the file.
+        columns (list): Optional projection; only these columns are read.
+        filters: Optional pyarrow row filters, pushed down to the reader.
+        strict (bool): Also reject columns the schema does not declare.
+
+    Raises:
+        SchemaError: If a required or requested column is missing, a column
+            has an incompatible type, or (strict) an undeclared column exists.
+    """
+    file_schema = pq.read_schema(path)
+    present = {name: file_schema.field(name).type for name in file_schema.names
+               if name not in IGNORED_COLUMNS}
+
+    missing = [c for c in list(required) + list(columns or []) if c not in present]
+    if missing:
+        raise SchemaError(f"{path}: missing columns {missing}")
+    drifted = [f"{name} ({present[name]} is not {kind})" for name, kind in schema.items()
+               if name in present and not _compatible(present[name], kind)]
+    if drifted:
+        raise SchemaError(f"{path}: incompatible column types: {', '.join(drifted)}")
+    if strict:
+        undeclared = [name for name in present if name not in schema]
+        if undeclared:
+            raise SchemaError(f"{path}: undeclared columns {undeclared}")
+
+    read_columns = list(columns) if columns else list(present)
+    categorical = [c for c in read_columns if schema.get(c) == 'category']
+    table = pq.read_table(path, columns=read_columns, filters=filters, read_dictionary=categorical)
+
+    target = pa.schema([
+        pa.field(name, ARROW_TYPES[schema[name]]) if name in schema else table.schema.field(name)
+        for name in table.column_names
+    ])
+    return table.cast(target).to_pandas()
+
+def load_grades(path, columns=None, filters=None, strict=False):
+    """Loads a student grades table (see GRADES_SCHEMA)."""
+    return load_table(path, GRADES_SCHEMA, GRADES_REQUIRED, columns, filters, strict)
+
+def load_risks(path, columns=None, filters=None, strict=False):
+    """Loads an at-risk students table (see RISKS_SCHEMA)."""
+    return load_table(path, RISKS_SCHEMA, RISKS_REQUIRED, columns, filters, strict)
@@ -0,0 +1,331 @@
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+import profiling
+from student_ids import ID_DICTIONARY_NAME
+from threshold_index import DEFAULT_THRESHOLD
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PIPELINE_STATE_FILE = ".pipeline_state.json"
+
+# --------------------------
+# Stage functions
+# --------------------------
+# Each stage is a module-level function so it can run in a worker process.
+# The pipeline scripts are imported lazily, so heavy optional dependencies
+# (qiskit, openai, h5py) load only in the stages that need them.
+
+def run_generate_grades(num_students, current_week):
+    from half_data_generator import generate_student_grades, save_to_parquet
+    save_to_parquet(generate_student_grades(num_students=num_students, current_week=current_week))
+
+def run_generate_history(num_students):
+    sys.path.insert(0, os.path.join(BACKEND_DIR, "..", "make2025"))
+    from complete_data_generator import generate_complete_student_data
+    generate_complete_student_data(output_path="complete_student_grades.parquet", num_students=num_students)
+
+def run_train():
+    from train_model import train_proper_model
+    train_proper_model()
+
+def run_predict(week, threshold):
+    from predict_risk import get_accurate_risks
+    get_accurate_risks(week, threshold)
+
+def run_filter(week):
+    from filter_data_for_goodstds import process_student_data
+    process_student_data(week, f"risks_week{week}.parquet", "student_grades.parquet",
+                         f"filtered_student_grades_week{week}.parquet")
+
+def run_project(week):
+    from grade_projection import project_final_grades
+    from parquet_loader import load_grades
+    projection = project_final_grades(load_grades("student_grades.parquet"), current_week=week)
+    projection.to_parquet(f"grade_projection_week{week}.parquet", index=False)
+
+def run_cluster(week):
+    from QAOA_clustering import run_clustering_pipeline, save_interpretation_to_file
+    best_bitstring, groups, interpretation, cut = run_clustering_pipeline(f"risks_week{week}.parquet")
+    save_interpretation_to_file(best_bitstring, groups, interpretation,
+                                filename=f"interpreted_result_week{week}.txt", cut=cut)
+
+def run_profiled(name, func, params):
+    """
+    Runs one stage in a worker. Returns {"records": ...} with its profiling
+    records, so the parent can fold every worker's timings into a single
+    run report, or {"error": ...} with the traceback as text. Exceptions are
+    not sent back as-is: some (e.g. openai's API errors) cannot be unpickled
+    in the parent, which breaks the pool for every other stage.
+    """
+    profiling.reset()
+    try:
+        with profiling.stage(name):
+            func(**params)
+    except Exception:
+        return {"error": traceback.format_exc()}
+    return {"records": profiling.records()}
+
+# --------------------------
+# Stage declarations
+# --------------------------
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    inputs are file paths or (path, {"week": N}) slices; a slice is
+    fingerprinted on its matching rows only, so editing one week's grades
+    leaves the other weeks' stages up to date. Stages that consume another
+    stage's outputs depend on it.
+
+    modules are the source files (relative to backend/) of the code the
+    stage runs, so editing e.g. predict_risk.py reruns the predict stages.
+
+    Every output must be rewritten each time the stage runs. The scripts
+    report many errors by printing and returning, so a stage that returns
+    without rewriting all its outputs counts as failed.
+    """
+    def __init__(self, name, func, inputs=(), outputs=(), params=None, modules=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.modules = list(modules)
+
+    def __repr__(self):
+        return f"Stage({self.name})"
+
+def build_stages(weeks=(10,), threshold=DEFAULT_THRESHOLD, num_students=60, current_week=10, history_students=1000):
+    """Declares the end-to-end risk pipeline, with one predict/filter/project/cluster chain per week."""
+    stages = [
+        Stage("generate_grades", run_generate_grades, outputs=["student_grades.parquet", ID_DICTIONARY_NAME],
+              params={"num_students": num_students, "current_week": current_week},
+              modules=["half_data_generator.py", "student_ids.py"]),
+        Stage("generate_history", run_generate_history, outputs=["complete_student_grades.parquet"],
+              params={"num_students": history_students},
+              modules=["../make2025/complete_data_generator.py"]),
+        Stage("train", run_train, inputs=["complete_student_grades.parquet"],
+              outputs=["temporal_model.pkl", "calibration_index.parquet"],
+              modules=["train_model.py", "parquet_loader.py", "student_ids.py", "threshold_index.py"]),
+    ]
+    for week in weeks:
+        stages += [
+            Stage(f"predict_week{week}", run_predict,
+                  inputs=[("student_grades.parquet", {"week": week}), "temporal_model.pkl"],
+                  outputs=[f"risks_week{week}.parquet", f"risk_index_week{week}.parquet"],
+                  params={"week": week, "threshold": threshold},
+                  modules=["predict_risk.py", "data_lake.py", "parquet_loader.py", "student_ids.py", "threshold_index.py"]),
+            Stage(f"filter_week{week}", run_filter,
+                  inputs=[("student_grades.parquet", {"week": week}), f"risks_week{week}.parquet"],
+                  outputs=[f"filtered_student_grades_week{week}.parquet"],
+                  params={"week": week},
+                  modules=["filter_data_for_goodstds.py"]),
+            # Uses every week up to this one, so the whole file is an input
+            Stage(f"project_week{week}", run_project,
+                  inputs=["student_grades.parquet"],
+                  outputs=[f"grade_projection_week{week}.parquet"],
+                  params={"week": week},
+                  modules=["grade_projection.py", "half_data_generator.py", "parquet_loader.py",
+                           "student_ids.py", "../make2025/complete_data_generator.py"]),
+            Stage(f"cluster_week{week}", run_cluster,
+                  inputs=[f"risks_week{week}.parquet"],
+                  outputs=[f"interpreted_result_week{week}.txt"],
+                  params={"week": week},
+                  modules=["QAOA_clustering.py", "parquet_loader.py"]),
+        ]
+    return stages
+
+# --------------------------
+# Fingerprinting
+# --------------------------
+
+def file_digest(path):
+    """SHA-256 of a file's bytes, or None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def slice_digest(path, selector):
+    """Content hash of only the Parquet rows matching selector, e.g. {"week": 10}."""
+    if not os.path.exists(path):
+        return None
+    dataset = ds.dataset(path, format="parquet")
+    expression = None
+    for column, value in sorted(selector.items()):
+        term = ds.field(column) == value
+        expression = term if expression is None else expression & term
+    df = dataset.to_table(filter=expression).to_pandas()
+    # Hash the values rather than the file layout, so rewriting a file with
+    # other string/integer encodings does not invalidate every slice
+    digest = hashlib.sha256(",".join(df.columns).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+def stage_fingerprint(stage):
+    """
+    Hashes everything a stage's outputs depend on: its parameters, its
+    inputs (whole files or row slices), the source of its wrapper function
+    and the source files of the modules doing the work.
+    """
+    inputs = {}
+    for spec in stage.inputs:
+        if isinstance(spec, tuple):
+            path, selector = spec
+            inputs[f"{path}{json.dumps(selector, sort_keys=True)}"] = slice_digest(path, selector)
+        else:
+            inputs[spec] = file_digest(spec)
+    payload = {
+        "name": stage.name,
+        "params": stage.params,
+        "inputs": inputs,
+        "code": hashlib.sha256(inspect.getsource(stage.func).encode()).hexdigest(),
+        "modules": {module: file_digest(os.path.join(BACKEND_DIR, module)) for module in stage.modules},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def load_state(path=PIPELINE_STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(state, path=PIPELINE_STATE_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+def output_mtimes(stage):
+    """Modification time (ns) of each output, or None if it does not exist."""
+    return {path: os.stat(path).st_mtime_ns if os.path.exists(path) else None
+            for path in stage.outputs}
+
+def is_up_to_date(stage, state):
+    """A stage is skipped when its fingerprint is unchanged and all outputs exist."""
+    return (state.get(stage.name) == stage_fingerprint(stage)
+            and all(os.path.exists(path) for path in stage.outputs))
+
+# --------------------------
+# Scheduler
+# --------------------------
+
+def stage_dependencies(stages):
+    """Maps each stage name to the names of the stages producing its inputs."""
+    producers = {path: stage.name for stage in stages for path in stage.outputs}
+    dependencies = {}
+    for stage in stages:
+        paths = [spec[0] if isinstance(spec, tuple) else spec for spec in stage.inputs]
+        dependencies[stage.name] = {producers[p] for p in paths if p in producers} - {stage.name}
+    return dependencies
+
+def run_pipeline(stages, max_workers=None, force=(), dry_run=False, state_file=PIPELINE_STATE_FILE):
+    """
+    Runs the stages in dependency order, in the current directory.
+
+    Each stage is fingerprinted just before it would run, after its upstream
+    stages have finished, and skipped when up to date (unless named in
+    force). Stages whose dependencies are satisfied run concurrently in a
+    process pool. A stage fails when it raises or leaves any output
+    unwritten; its fingerprint is then dropped, so the next run retries it.
+    Returns {stage name: "ran" | "skipped" | "failed" | "blocked"}.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    dependencies = stage_dependencies(stages)
+    state = load_state(state_file)
+    status = {}
+    running = {}
+    # Output mtimes when each running stage was submitted
+    before = {}
+
+    def fail(name, message):
+        status[name] = "failed"
+        print(f"[fail] {name}: {message}")
+        if state.pop(name, None) is not None:
+            save_state(state, state_file)
+
+    def ready():
+        return [name for name in by_name
+                if name not in status and name not in running.values()
+                and all(status.get(dep) in ("ran", "skipped") for dep in dependencies[name])]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            # Skipping a stage can release its dependents, so keep
+            # scheduling until nothing new becomes ready
+            pending = ready()
+            while pending:
+                for name in pending:
+                    stage = by_name[name]
+                    if name not in force and is_up_to_date(stage, state):
+                        status[name] = "skipped"
+                        print(f"[skip] {name}")
+                    elif dry_run:
+                        status[name] = "ran"
+                        print(f"[would run] {name}")
+                    else:
+                        print(f"[run ] {name}")
+                        before[name] = output_mtimes(stage)
+                        try:
+                            running[pool.submit(run_profiled, name, stage.func, stage.params)] = name
+                        except BrokenProcessPool as e:
+                            # A worker died outright (e.g. out of memory); nothing more can run
+                            fail(name, e)
+                pending = ready()
+
+            if not running:
+                # Anything left has a failed or blocked dependency
+                for name in by_name:
+                    status.setdefault(name, "blocked")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    fail(name, e)
+                    continue
+                if "error" in outcome:
+                    fail(name, f"\n{outcome['error']}")
+                    continue
+                entries = outcome["records"]
+                # Worker stages nest under this run in the report
+                for entry in entries:
+                    entry["stage"] = f"pipeline/{entry['stage']}"
+                    entry["depth"] += 1
+                profiling.extend_records(entries)
+                after = output_mtimes(by_name[name])
+                stale = [path for path, mtime in after.items() if mtime is None or mtime == before[name][path]]
+                if stale:
+                    fail(name, f"returned without writing {', '.join(stale)}")
+                    continue
+                status[name] = "ran"
+                state[name] = stage_fingerprint(by_name[name])
+                save_state(state, state_file)
+                print(f"[done] {name}")
+    return status
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    with profiling.stage("pipeline"):
+        results = run_pipeline(build_stages(weeks=[5, 10]))
+    print(json.dumps(results, indent=2))
+    print(f"Pipeline finished in {time.perf_counter() - start:.1f}s")
+    profiling.print_summary()
+    profiling.write_run_report()
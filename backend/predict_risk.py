@@ -1,34 +1,44 @@
 import pandas as pd
 import joblib
 import numpy as np
-from sklearn.calibration import calibration_curve
 
+from data_lake import write_partition
+from parquet_loader import load_grades
+from profiling import profiled, print_summary, stage, write_run_report
+from student_ids import STUDENT_CODE_COLUMN, student_keys
+from threshold_index import DEFAULT_THRESHOLD, ThresholdIndex
+
+@profiled("get_accurate_risks")
 def get_accurate_risks(week: int, threshold: float = 0.5):
     try:
-        pipeline = joblib.load('temporal_model.pkl')
-        df = pd.read_parquet("student_grades.parquet")
+        with stage("load") as step:
+            pipeline = joblib.load('temporal_model.pkl')
+            # The week filter is pushed down to the Parquet reader
+            df = load_grades("student_grades.parquet", filters=[('week', '==', week)])
+            step["rows"] = len(df)
         
-        # Filter only by the week and where failing_probability is not yet set
-        current_data = df[
-            (df['week'] == week) & 
-            (df['failing_probability'].isna())
-        ].copy()
+        # Keep only rows where failing_probability is not yet set
+        current_data = df[df['failing_probability'].isna()].copy()
         
-        # Calculate grade trend using a rolling mean and percentage change
-        current_data['grade_trend'] = current_data.groupby('student_id')['current_grade'].transform(
-            lambda x: (x.rolling(3, min_periods=1).mean()
-                      .pct_change()
-                      .fillna(0))
-        )
+        with stage("feature_engineering", rows=len(current_data)):
+            # Group on the integer student codes rather than the ID strings
+            students = student_keys(current_data)
+            
+            # Calculate grade trend using a rolling mean and percentage change
+            current_data['grade_trend'] = current_data.groupby(students)['current_grade'].transform(
+                lambda x: (x.rolling(3, min_periods=1).mean()
+                          .pct_change()
+                          .fillna(0))
+            )
         
-        # Calculate if there is a significant drop in recent homework grades
-        current_data['recent_hw_drop'] = current_data.groupby('student_id')['homework_grade'].transform(
-            lambda x: (x.rolling(2).mean()
-                      .diff()
-                      .lt(-5)
-                      .fillna(0)
-                      .astype(int))
-        )
+            # Calculate if there is a significant drop in recent homework grades
+            current_data['recent_hw_drop'] = current_data.groupby(students)['homework_grade'].transform(
+                lambda x: (x.rolling(2).mean()
+                          .diff()
+                          .lt(-5)
+                          .fillna(0)
+                          .astype(int))
+            )
         
         required_features = [
             'course_name',
@@ -40,7 +50,13 @@ def get_accurate_risks(week: int, threshold: float = 0.5):
         ]
         
         # Predict the probability of failing
-        current_data['failure_prob'] = pipeline.predict_proba(current_data[required_features])[:, 1]
+        with stage("predict_proba", rows=len(current_data)):
+            current_data['failure_prob'] = pipeline.predict_proba(current_data[required_features])[:, 1]
+        
+        # Index every scored student, not just those above threshold, so any
+        # other cutoff can be queried later without rescoring
+        with stage("threshold_index", rows=len(current_data)):
+            ThresholdIndex(current_data).save(f"risk_index_week{week}.parquet")
         
         # Identify weakest area for each student
         def identify_weakest_area(row):
@@ -59,9 +75,10 @@ def get_accurate_risks(week: int, threshold: float = 0.5):
             }
         
         # Apply the analysis to each student
-        weakness_analysis = current_data.apply(identify_weakest_area, axis=1)
-        current_data['weakest_area'] = [x['weakest_area'] for x in weakness_analysis]
-        current_data['area_score'] = [x['area_score'] for x in weakness_analysis]
+        with stage("weakness_analysis", rows=len(current_data)):
+            weakness_analysis = current_data.apply(identify_weakest_area, axis=1)
+            current_data['weakest_area'] = [x['weakest_area'] for x in weakness_analysis]
+            current_data['area_score'] = [x['area_score'] for x in weakness_analysis]
         
         # Filter students whose probability exceeds the threshold
         at_risk = current_data[current_data['failure_prob'] >= threshold]
@@ -78,7 +95,7 @@ def get_accurate_risks(week: int, threshold: float = 0.5):
                 'homework_avg',
                 'quiz_avg',
                 'current_grade'
-            ]].copy()
+            ] + ([STUDENT_CODE_COLUMN] if STUDENT_CODE_COLUMN in at_risk.columns else [])].copy()
             
             # Add a summary of the weakness
             result_df['weakness_summary'] = result_df.apply(
@@ -92,7 +109,14 @@ def get_accurate_risks(week: int, threshold: float = 0.5):
             )
             
             # Save the results
-            result_df.to_parquet(f"risks_week{week}.parquet")
+            with stage("parquet_write", rows=len(result_df)):
+                result_df.to_parquet(f"risks_week{week}.parquet")
+            
+            # Also replace this week's partitions in the data lake; every
+            # scored course is written, so one with nobody at risk is emptied
+            with stage("lake_write", rows=len(result_df)):
+                for course_name in current_data['course_name'].unique():
+                    write_partition("risks", result_df[result_df['course_name'] == course_name], course_name, week)
             return result_df
             
     except Exception as e:
@@ -101,7 +125,7 @@ def get_accurate_risks(week: int, threshold: float = 0.5):
 
 if __name__ == "__main__":
     week = 10
-    threshold = 0.65
+    threshold = DEFAULT_THRESHOLD
     at_risk_students = get_accurate_risks(week, threshold)
     
     # Print detailed analysis for each at-risk student
@@ -113,4 +137,7 @@ if __name__ == "__main__":
             print(f"Failure Probability: {student['failure_prob']:.1%}")
             print(f"Analysis: {student['weakness_summary']}")
     else:
-        print("No at-risk students found for the given week and threshold.")
\ No newline at end of file
+        print("No at-risk students found for the given week and threshold.")
+
+    print_summary()
+    write_run_report()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import cProfile
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Run reports (and cProfile dumps) are written here
+REPORT_DIR = "run_reports"
+# Set PROFILE_STAGES=1 to also dump a cProfile per top-level stage
+PROFILE_ENV = "PROFILE_STAGES"
+
+_records = []
+_local = threading.local()
+_lock = threading.Lock()
+# pid of the process whose stage owns the active cProfile, if any
+_profiling = None
+_epoch = time.perf_counter()
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+@contextmanager
+def stage(name, rows=None, profile_dir=None):
+    """
+    Records wall time, CPU time, peak RSS and an optional row count for the
+    enclosed block. Stages nest: a stage opened inside another is recorded
+    as "outer/inner". Set the row count up front or later with
+    record_rows. When profile_dir is given (or PROFILE_STAGES is set) the
+    outermost stage is also run under cProfile and dumped to
+    <profile_dir>/<name>.prof.
+    """
+    global _profiling
+    stack = _stack()
+    entry = {
+        "stage": "/".join([e["name"] for e in stack] + [name]),
+        "name": name,
+        "depth": len(stack),
+        "rows": rows,
+    }
+    if profile_dir is None and os.environ.get(PROFILE_ENV):
+        profile_dir = REPORT_DIR
+    profiler = None
+    # Only one cProfile can be active per process, so nested stages share
+    # it; forked workers inherit the flag but not the profiler
+    if profile_dir and _profiling != os.getpid():
+        profiler = cProfile.Profile()
+        _profiling = os.getpid()
+
+    start_rss = peak_rss_mb()
+    start_cpu = time.process_time()
+    start_wall = time.perf_counter()
+    entry["start_s"] = round(start_wall - _epoch, 6)
+    stack.append(entry)
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield entry
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _profiling = None
+            os.makedirs(profile_dir, exist_ok=True)
+            entry["profile"] = os.path.join(profile_dir, f"{name}.prof")
+            profiler.dump_stats(entry["profile"])
+        stack.pop()
+        entry["wall_s"] = round(time.perf_counter() - start_wall, 6)
+        entry["cpu_s"] = round(time.process_time() - start_cpu, 6)
+        entry["peak_rss_mb"] = round(peak_rss_mb(), 2)
+        entry["rss_growth_mb"] = round(entry["peak_rss_mb"] - start_rss, 2)
+        with _lock:
+            _records.append(entry)
+
+def record_rows(rows):
+    """Sets the row count of the innermost open stage."""
+    stack = _stack()
+    if stack:
+        stack[-1]["rows"] = int(rows)
+
+def profiled(name=None):
+    """
+    Decorator running a function inside stage(name). If the function
+    returns a DataFrame or array and no row count was recorded, its length
+    is used.
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name) as entry:
+                result = func(*args, **kwargs)
+                if entry["rows"] is None and hasattr(result, "shape"):
+                    entry["rows"] = int(result.shape[0])
+                return result
+        return wrapper
+    return decorator
+
+def records():
+    """Stage records so far, in completion order (inner stages first)."""
+    with _lock:
+        return list(_records)
+
+def extend_records(entries):
+    """Adds records collected elsewhere, e.g. in a worker process."""
+    with _lock:
+        _records.extend(entries)
+
+def reset():
+    with _lock:
+        _records.clear()
+
+def run_report():
+    """Structured summary of this run: metadata plus one entry per stage."""
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "argv": sys.argv,
+        "python": sys.version.split()[0],
+        "pid": os.getpid(),
+        "peak_rss_mb": round(peak_rss_mb(), 2),
+        "stages": records(),
+    }
+
+def write_run_report(path=None, report_dir=REPORT_DIR):
+    """
+    Writes run_report() as JSON. The default path is
+    <report_dir>/<last top-level stage>_<timestamp>.json, so successive
+    runs are kept side by side for comparison. Returns the path.
+    """
+    report = run_report()
+    if path is None:
+        # Outer stages complete last, so the last top-level one names the run
+        top_level = [r["name"] for r in report["stages"] if r["depth"] == 0]
+        label = top_level[-1] if top_level else "run"
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(report_dir, f"{label}_{timestamp}.json")
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Run report saved to {path}")
+    return path
+
+def print_summary(entries=None):
+    """Prints an indented table of the recorded stages."""
+    entries = records() if entries is None else entries
+    print(f"{'stage':<45}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}{'rows':>10}")
+    for entry in sorted(entries, key=lambda e: e["start_s"]):
+        label = "  " * entry["depth"] + entry["name"]
+        rows = "" if entry["rows"] is None else entry["rows"]
+        print(f"{label:<45}{entry['wall_s']:>10.3f}{entry['cpu_s']:>10.3f}"
+              f"{entry['peak_rss_mb']:>10.1f}{rows:>10}")
@@ -0,0 +1,89 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from parquet_loader import load_risks
+
+GROUP_COLUMNS = ['course_name', 'week']
+# Every dataset version is ranked this deep once; smaller k are slices of it
+DEFAULT_DEPTH = 100
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def top_k_positions(scores, k):
+    """
+    Positions of the k largest scores, largest first. np.argpartition
+    selects them in O(n); only the k survivors are sorted.
+    """
+    scores = np.asarray(scores, dtype=float)
+    if k <= 0 or len(scores) == 0:
+        return np.array([], dtype=int)
+    # NaN never ranks
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    order = np.argsort(-scores[candidates], kind='stable')
+    return candidates[order]
+
+def top_k_per_group(df, k, by=GROUP_COLUMNS, score='failure_prob'):
+    """
+    The k highest-score rows of each group, with a 1-based risk_rank.
+    Groups are partially selected rather than sorted in full.
+    """
+    if df.empty:
+        return df.assign(risk_rank=pd.Series(dtype=int))
+    scores = df[score].to_numpy(dtype=float)
+    parts = []
+    for _, positions in df.groupby(list(by), observed=True, sort=True).indices.items():
+        chosen = positions[top_k_positions(scores[positions], k)]
+        parts.append(df.iloc[chosen].assign(risk_rank=np.arange(1, len(chosen) + 1)))
+    return pd.concat(parts, ignore_index=True)
+
+def dataset_version(path):
+    """Identifies one version of a file: its path, size and modification time."""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+def _ranked(path, depth, loader):
+    """
+    Per-group rankings of a dataset, at least depth deep, computed once per
+    dataset version. Returns {(course_name, week): ranked DataFrame}.
+    """
+    version = dataset_version(path)
+    with _cache_lock:
+        entry = _cache.get(version[0])
+        if entry and entry['version'] == version and entry['depth'] >= depth:
+            return entry['groups']
+
+    ranked = top_k_per_group(loader(path), depth)
+    groups = {(str(course), int(week)): part.reset_index(drop=True)
+              for (course, week), part in ranked.groupby(GROUP_COLUMNS, observed=True)}
+    with _cache_lock:
+        # One entry per path: a new version replaces the old one
+        _cache[version[0]] = {'version': version, 'depth': depth, 'groups': groups}
+    return groups
+
+def top_k_riskiest(path, k=20, course=None, week=None, loader=load_risks):
+    """
+    The k riskiest students of each (course_name, week) group in a risks
+    file, optionally restricted to one course and/or week. Repeated queries
+    against the same file version are served from the cache by slicing.
+    Raises ValueError when k is less than 1.
+    """
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+    groups = _ranked(path, max(k, DEFAULT_DEPTH), loader)
+    parts = [part.iloc[:k] for (c, w), part in sorted(groups.items())
+             if (course is None or c == str(course)) and (week is None or w == int(week))]
+    if not parts:
+        return pd.DataFrame()
+    return pd.concat(parts, ignore_index=True)
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -1,21 +1,134 @@
 import PyPDF2
 import openai
 from openai import OpenAI
+import asyncio
+import hashlib
 import json
 import logging
+import os
 from datetime import datetime
 import time
+from concurrent.futures import ProcessPoolExecutor
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extracts text from a PDF file."""
-    text = ""
+# Bump whenever SYLLABUS_PROMPT changes so cached extractions are not reused
+PROMPT_VERSION = "1"
+SYLLABUS_CACHE_DIR = "syllabus_cache"
+PDF_TEXT_CACHE_DIR = "pdf_text_cache"
+
+SYLLABUS_PROMPT = """Please analyze this syllabus and extract the following information:
+
+1. For Homework:
+   - Find the total possible points for homework assignments
+   - Extract the weight of homework in the final grade
+
+2. For Quizzes:
+   - Find the total possible points for quizzes
+   - Extract the weight of quizzes in the final grade
+
+3. For the Midterm Exam:
+   - Find the total possible points for the midterm
+   - Extract the weight of the midterm in the final grade
+
+4. For the Final Exam:
+   - Find the total possible points for the final exam
+   - Extract the weight of the final exam in the final grade
+
+Please extract the actual points and weights mentioned in the syllabus. Do not make any assumptions about points being out of 100.
+Format the output as a JSON object with this structure:
+{
+    "homework": {"points": <actual points>, "weight": <actual weight>},
+    "quizzes": {"points": <actual points>, "weight": <actual weight>},
+    "midterm": {"points": <actual points>, "weight": <actual weight>},
+    "final_exam": {"points": <actual points>, "weight": <actual weight>}
+}
+
+If any information is not found in the syllabus, use null for that value.
+
+Syllabus text:
+{syllabus_text}"""
+
+def build_syllabus_prompt(syllabus_text: str) -> str:
+    """Fills the extraction prompt with the syllabus text."""
+    return SYLLABUS_PROMPT.replace("{syllabus_text}", syllabus_text)
+
+def backoff_delays(initial: float = 0.25, factor: float = 1.6, maximum: float = 5.0):
+    """Yields polling delays that grow geometrically up to a cap."""
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * factor, maximum)
+
+def pdf_content_hash(pdf_path: str) -> str:
+    """SHA-256 of a file's bytes, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _extract_page_range(args) -> list:
+    """Process-pool worker: extracts the text of pages [start, stop) of a PDF."""
+    pdf_path, start, stop = args
     with open(pdf_path, 'rb') as file:
         reader = PyPDF2.PdfReader(file)
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text
-    return text
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def iter_pdf_pages(pdf_path: str, max_workers: int = None, pages_per_task: int = 8,
+                   cache_dir: str = PDF_TEXT_CACHE_DIR):
+    """
+    Yields the text of each page of a PDF in page order.
+    Page ranges are extracted in a process pool, and pages are yielded as
+    soon as their range finishes, so a consumer can stop early and any
+    remaining work is cancelled. The pages read are cached under the PDF's
+    content hash, also when the consumer stops early; later calls replay
+    the cached pages and extract only the pages after them.
+    """
+    key = pdf_content_hash(pdf_path)
+    cache_path = os.path.join(cache_dir, f"{key}.json")
+    cached, num_pages = [], None
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            entry = json.load(f)
+        # Older caches hold the page list of a complete pass
+        if isinstance(entry, list):
+            entry = {"num_pages": len(entry), "pages": entry}
+        cached, num_pages = entry["pages"], entry["num_pages"]
+        yield from cached
+
+    if num_pages is None:
+        with open(pdf_path, 'rb') as file:
+            num_pages = len(PyPDF2.PdfReader(file).pages)
+    ranges = [(pdf_path, start, min(start + pages_per_task, num_pages))
+              for start in range(len(cached), num_pages, pages_per_task)]
+
+    pages = list(cached)
+    try:
+        if len(ranges) <= 1:
+            for task in ranges:
+                for page_text in _extract_page_range(task):
+                    pages.append(page_text)
+                    yield page_text
+        else:
+            pool = ProcessPoolExecutor(max_workers=max_workers)
+            try:
+                for chunk in pool.map(_extract_page_range, ranges):
+                    for page_text in chunk:
+                        pages.append(page_text)
+                        yield page_text
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+    finally:
+        # Runs when the consumer closes the generator early, too
+        if len(pages) > len(cached):
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"num_pages": num_pages, "pages": pages}, f)
+            os.replace(tmp_path, cache_path)
+
+def extract_text_from_pdf(pdf_path: str) -> str:
+    """Extracts text from a PDF file."""
+    return "".join(iter_pdf_pages(pdf_path))
 
 def extract_syllabus_info(client, assistant_id: str, syllabus_text: str) -> dict:
     """Uses existing OpenAI Assistant to extract syllabus information."""
@@ -27,37 +140,7 @@ def extract_syllabus_info(client, assistant_id: str, syllabus_text: str) -> dict
         message = client.beta.threads.messages.create(
             thread_id=thread.id,
             role="user",
-            content=f"""Please analyze this syllabus and extract the following information:
-
-            1. For Homework:
-               - Find the total possible points for homework assignments
-               - Extract the weight of homework in the final grade
-            
-            2. For Quizzes:
-               - Find the total possible points for quizzes
-               - Extract the weight of quizzes in the final grade
-            
-            3. For the Midterm Exam:
-               - Find the total possible points for the midterm
-               - Extract the weight of the midterm in the final grade
-            
-            4. For the Final Exam:
-               - Find the total possible points for the final exam
-               - Extract the weight of the final exam in the final grade
-
-            Please extract the actual points and weights mentioned in the syllabus. Do not make any assumptions about points being out of 100.
-            Format the output as a JSON object with this structure:
-            {{
-                "homework": {{"points": <actual points>, "weight": <actual weight>}},
-                "quizzes": {{"points": <actual points>, "weight": <actual weight>}},
-                "midterm": {{"points": <actual points>, "weight": <actual weight>}},
-                "final_exam": {{"points": <actual points>, "weight": <actual weight>}}
-            }}
-
-            If any information is not found in the syllabus, use null for that value.
-
-            Syllabus text:
-            {syllabus_text}"""
+            content=build_syllabus_prompt(syllabus_text)
         )
 
         # Run the assistant
@@ -66,8 +149,8 @@ def extract_syllabus_info(client, assistant_id: str, syllabus_text: str) -> dict
             assistant_id=assistant_id
         )
 
-        # Wait for the run to complete
-        while True:
+        # Wait for the run to complete, polling quickly at first and backing off
+        for delay in backoff_delays():
             run_status = client.beta.threads.runs.retrieve(
                 thread_id=thread.id,
                 run_id=run.id
@@ -76,7 +159,7 @@ def extract_syllabus_info(client, assistant_id: str, syllabus_text: str) -> dict
                 break
             elif run_status.status in ['failed', 'cancelled', 'expired']:
                 raise Exception(f"Run failed with status: {run_status.status}")
-            time.sleep(1)
+            time.sleep(delay)
 
         # Get the assistant's response
         messages = client.beta.threads.messages.list(
@@ -84,19 +167,128 @@ def extract_syllabus_info(client, assistant_id: str, syllabus_text: str) -> dict
         )
         
         # Parse the JSON response
-        for msg in messages.data:
-            if msg.role == "assistant":
-                try:
-                    return json.loads(msg.content[0].text.value)
-                except json.JSONDecodeError as e:
-                    print(f"Error parsing JSON: {e}")
-                    print(f"Raw response: {msg.content[0].text.value}")
-                    return None
+        return parse_assistant_json(messages)
 
     except Exception as e:
         logging.error(f"Error in extract_syllabus_info: {str(e)}")
         return None
 
+def parse_assistant_json(messages):
+    """Returns the JSON payload of the first assistant message, or None."""
+    for msg in messages.data:
+        if msg.role == "assistant":
+            try:
+                return json.loads(msg.content[0].text.value)
+            except json.JSONDecodeError as e:
+                print(f"Error parsing JSON: {e}")
+                print(f"Raw response: {msg.content[0].text.value}")
+                return None
+    return None
+
+async def extract_syllabus_info_async(client, assistant_id: str, syllabus_text: str) -> dict:
+    """Async version of extract_syllabus_info for an openai.AsyncOpenAI client."""
+    try:
+        thread = await client.beta.threads.create()
+        await client.beta.threads.messages.create(
+            thread_id=thread.id,
+            role="user",
+            content=build_syllabus_prompt(syllabus_text)
+        )
+        run = await client.beta.threads.runs.create(
+            thread_id=thread.id,
+            assistant_id=assistant_id
+        )
+
+        for delay in backoff_delays():
+            run_status = await client.beta.threads.runs.retrieve(
+                thread_id=thread.id,
+                run_id=run.id
+            )
+            if run_status.status == 'completed':
+                break
+            elif run_status.status in ['failed', 'cancelled', 'expired']:
+                raise Exception(f"Run failed with status: {run_status.status}")
+            await asyncio.sleep(delay)
+
+        messages = await client.beta.threads.messages.list(thread_id=thread.id)
+        return parse_assistant_json(messages)
+
+    except Exception as e:
+        logging.error(f"Error in extract_syllabus_info_async: {str(e)}")
+        return None
+
+# === Cached batch extraction ===
+
+def syllabus_cache_key(pdf_path: str) -> str:
+    """Hashes the PDF bytes together with PROMPT_VERSION."""
+    return hashlib.sha256(f"prompt-v{PROMPT_VERSION}:{pdf_content_hash(pdf_path)}".encode()).hexdigest()
+
+def load_cached_syllabus(key: str, cache_dir: str = SYLLABUS_CACHE_DIR):
+    """Returns the cached extraction for key, or None."""
+    path = os.path.join(cache_dir, f"{key}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def store_cached_syllabus(key: str, info: dict, cache_dir: str = SYLLABUS_CACHE_DIR):
+    """Atomically writes an extraction to the cache."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(info, f, indent=2)
+    os.replace(tmp_path, path)
+
+async def extract_syllabi_async(client, assistant_id: str, pdf_paths, max_concurrency: int = 4,
+                                cache_dir: str = SYLLABUS_CACHE_DIR) -> dict:
+    """
+    Extracts grading information from many syllabi at once.
+    PDFs whose content hash and prompt version are already cached are
+    answered from disk. The rest run concurrently, at most max_concurrency
+    assistant runs at a time, and duplicate PDFs share one run.
+    Returns {pdf_path: info or None}.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    in_flight = {}
+
+    async def fetch(key, pdf_path):
+        cached = load_cached_syllabus(key, cache_dir)
+        if cached is not None:
+            return cached
+        async with semaphore:
+            syllabus_text = await asyncio.to_thread(extract_text_from_pdf, pdf_path)
+            info = await extract_syllabus_info_async(client, assistant_id, syllabus_text)
+        if info is not None:
+            store_cached_syllabus(key, info, cache_dir)
+        return info
+
+    async def process(pdf_path):
+        key = await asyncio.to_thread(syllabus_cache_key, pdf_path)
+        # Identical PDFs in the same batch share a single assistant run
+        if key not in in_flight:
+            in_flight[key] = asyncio.ensure_future(fetch(key, pdf_path))
+        return pdf_path, await in_flight[key]
+
+    results = await asyncio.gather(*(process(path) for path in pdf_paths))
+    return dict(results)
+
+def extract_syllabi(assistant_id: str, pdf_paths, api_key: str = None, base_url: str = None,
+                    max_concurrency: int = 4, cache_dir: str = SYLLABUS_CACHE_DIR) -> dict:
+    """
+    Synchronous entry point for extract_syllabi_async. base_url can point
+    the client at a local stub server for testing; both it and api_key
+    default to the OPENAI_BASE_URL / OPENAI_API_KEY environment variables.
+    """
+    async def run():
+        client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url)
+        try:
+            return await extract_syllabi_async(client, assistant_id, pdf_paths,
+                                               max_concurrency, cache_dir)
+        finally:
+            await client.close()
+    return asyncio.run(run())
+
 def main():
     # Initialize OpenAI client
     client = openai.OpenAI(
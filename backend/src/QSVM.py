@@ -1,4 +1,3 @@
-import pennylane as qml
 import numpy as np
 from sklearn.svm import SVC
 from sklearn.datasets import make_classification
@@ -7,28 +6,10 @@ from sklearn.metrics import accuracy_score, classification_report
 import matplotlib.pyplot as plt
 import json
 
-# --------------------------
-# Part 1: Define Quantum Feature Map & Kernel in PennyLane
-# --------------------------
-# Use PennyLane's default.qubit simulator (fast and efficient)
-n_wires = 2
-dev = qml.device("default.qubit", wires=n_wires)
-
-@qml.qnode(dev)
-def feature_map(x):
-    # Use a simple embedding: encode each feature into a rotation angle
-    qml.AngleEmbedding(x, wires=range(n_wires))
-    # Introduce entanglement
-    qml.CNOT(wires=[0, 1])
-    qml.RZ(np.pi / 4, wires=1)
-    return qml.state()
-
-def quantum_kernel(x1, x2):
-    # Compute state vectors for both inputs
-    psi1 = feature_map(x1)
-    psi2 = feature_map(x2)
-    # The kernel is the squared magnitude of the inner product
-    return np.abs(np.vdot(psi1, psi2))**2
+# The feature map, statevector and kernel code lives in qsvm_kernel so it
+# can be imported (e.g. by benchmark.py) without running this experiment
+from qsvm_kernel import compute_kernel_matrix, nystroem_accuracy_report
+from profiling import print_summary, write_run_report
 
 # --------------------------
 # Part 2: Build Kernel Matrix and Train SVM
@@ -41,16 +22,6 @@ X, y = make_classification(n_samples=100, n_features=2,
 X_train, X_test, y_train, y_test = train_test_split(
     X, y, test_size=0.3, random_state=42)
 
-# Compute the quantum kernel matrix for training data
-def compute_kernel_matrix(X1, X2):
-    n1 = X1.shape[0]
-    n2 = X2.shape[0]
-    K = np.zeros((n1, n2))
-    for i in range(n1):
-        for j in range(n2):
-            K[i, j] = quantum_kernel(X1[i], X2[j])
-    return K
-
 # Compute training and testing kernel matrices
 K_train = compute_kernel_matrix(X_train, X_train)
 K_test = compute_kernel_matrix(X_test, X_train)  # note: test vs training
@@ -72,6 +43,16 @@ report_dict = classification_report(y_test, y_pred, output_dict=True)
 with open("svm_results_pennylane.json", "w") as f:
     json.dump(report_dict, f, indent=2)
 
+# Compare the Nystroem approximation against the exact kernel for several m
+nystroem_report = nystroem_accuracy_report(X_train, y_train, X_test, y_test,
+                                           [2, 4, 8, 16, 32, 70], accuracy)
+print("\nNystroem accuracy vs landmarks:")
+for row in nystroem_report:
+    print(f"  m={row['m']:3d}  accuracy={row['accuracy']:.3f}  "
+          f"exact={row['exact_accuracy']:.3f}  kernel error={row['relative_kernel_error']:.3e}")
+with open("nystroem_report_pennylane.json", "w") as f:
+    json.dump(nystroem_report, f, indent=2)
+
 # --------------------------
 # Part 3: Use AI (Transformer) to Interpret Results
 # --------------------------
@@ -115,4 +96,7 @@ plt.scatter(X_test[:, 0], X_test[:, 1], c=y_test, marker='x', label='Test')
 plt.title("PennyLane Quantum Kernel SVM Decision Boundary")
 plt.legend()
 plt.savefig("decision_boundary_pennylane.png")
+
+print_summary()
+write_run_report()
 plt.show()
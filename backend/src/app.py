@@ -1,20 +1,29 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
-import pandas as pd
 import os
+import sys
 import math
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parquet_loader import load_risks
+from risk_ranking import top_k_riskiest
+from student_ids import STUDENT_CODE_COLUMN
+from threshold_index import DEFAULT_THRESHOLD, ThresholdIndex, load_index
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS
 
-# Load the student grades data from the Parquet file
-parquet_file_path = os.path.join(os.path.dirname(__file__), 'risks_week10.parquet')
+# Load the student grades data from the Parquet file, next to this script
+# unless RISKS_DIR points elsewhere
+RISKS_DIR = os.environ.get('RISKS_DIR', os.path.dirname(__file__))
+parquet_file_path = os.path.join(RISKS_DIR, 'risks_week10.parquet')
 
 if not os.path.exists(parquet_file_path):
     raise FileNotFoundError(f"Parquet file not found at: {parquet_file_path}")
 
 try:
-    student_grades_df = pd.read_parquet(parquet_file_path)
+    # student_code is internal; clients identify students by student_id
+    student_grades_df = load_risks(parquet_file_path).drop(columns=[STUDENT_CODE_COLUMN], errors='ignore')
 except Exception as e:
     raise RuntimeError(f"Error reading Parquet file: {e}")
 
@@ -29,10 +38,19 @@ student_grades = student_grades_df.to_dict(orient='records')
 # Filter rows where week is equal to 10
 student_grades_df = student_grades_df[student_grades_df['week'] == 10]
 
+# Threshold index over every scored student when predict_risk saved one,
+# otherwise over the at-risk rows loaded above. Built before failure_prob
+# is converted to a percentage.
+index_file_path = os.path.join(RISKS_DIR, 'risk_index_week10.parquet')
+risk_index = load_index(index_file_path) if os.path.exists(index_file_path) else ThresholdIndex(student_grades_df)
+
+# Probabilities of the records below, kept as fractions for recoloring
+record_probs = student_grades_df['failure_prob'].to_numpy(dtype=float)
+
 # Add dynamic fields
 def add_dynamic_fields(row):
     # Example logic to set dotColor based on failure probability
-    if row['failure_prob'] is not None and row['failure_prob'] >= 0.65:
+    if row['failure_prob'] is not None and row['failure_prob'] >= DEFAULT_THRESHOLD:
         row['dotColor'] = 'red'
     else:
         row['dotColor'] = 'green'
@@ -53,9 +71,36 @@ student_grades_df = student_grades_df.apply(add_dynamic_fields, axis=1)
 # Convert DataFrame to list of dictionaries
 student_grades = student_grades_df.to_dict(orient='records')
 
+def with_dot_colors(threshold):
+    """Recolors the records for another cutoff, keeping their order."""
+    red = record_probs >= threshold
+    return [dict(row, dotColor='red' if is_red else 'green') for row, is_red in zip(student_grades, red)]
+
 @app.route('/api/student-grades', methods=['GET'])
 def get_student_grades():
-    return jsonify(student_grades)
+    threshold = request.args.get('threshold', type=float)
+    if threshold is None:
+        return jsonify(student_grades)
+    return jsonify(with_dot_colors(threshold))
+
+@app.route('/api/top-risks', methods=['GET'])
+def get_top_risks():
+    # The k riskiest students per course and week, cached per version of the file
+    k = request.args.get('k', 20, type=int)
+    if k < 1:
+        return jsonify({'error': 'k must be at least 1'}), 400
+    course = request.args.get('course')
+    week = request.args.get('week', type=int)
+    top = top_k_riskiest(parquet_file_path, k, course, week)
+    return jsonify(top.drop(columns=[STUDENT_CODE_COLUMN], errors='ignore').to_dict(orient='records'))
+
+@app.route('/api/risk-threshold', methods=['GET'])
+def get_risk_threshold():
+    # Counts (and precision/recall when the index is labelled) for any cutoff
+    threshold = request.args.get('threshold', DEFAULT_THRESHOLD, type=float)
+    course = request.args.get('course')
+    week = request.args.get('week', type=int)
+    return jsonify(risk_index.summary(threshold, course, week))
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,91 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Directory holding cached kernel matrices as .npy files
+KERNEL_CACHE_DIR = "kernel_cache"
+
+def kernel_cache_key(X1, X2, feature_map_key):
+    """
+    Returns a SHA-256 key over both datasets (values, dtype and shape) and a
+    string identifying the feature map, so a change to either invalidates
+    the cached matrix.
+    """
+    digest = hashlib.sha256(feature_map_key.encode())
+    for X in (X1, X2):
+        X = np.ascontiguousarray(X, dtype=float)
+        digest.update(str(X.shape).encode())
+        digest.update(X.tobytes())
+    return digest.hexdigest()
+
+def tile_ranges(n, tile_size):
+    """Splits range(n) into consecutive (start, stop) tiles."""
+    return [(start, min(start + tile_size, n)) for start in range(0, n, tile_size)]
+
+def _compute_tile(args):
+    """
+    Process-pool worker: computes one kernel tile |psi1 psi2^H|^2 and writes
+    it (and its mirror for symmetric matrices) straight into the memory-mapped
+    output, so only the input state blocks cross the process boundary.
+    """
+    path, rows, cols, psi_rows, psi_cols, mirror = args
+    tile = np.abs(psi_rows.conj() @ psi_cols.T)**2
+    K = np.load(path, mmap_mode="r+")
+    K[rows[0]:rows[1], cols[0]:cols[1]] = tile
+    if mirror:
+        K[cols[0]:cols[1], rows[0]:rows[1]] = tile.T
+    K.flush()
+    return rows, cols
+
+def cached_kernel_matrix(X1, X2, statevector_fn, feature_map_key, tile_size=512,
+                         max_workers=None, cache_dir=KERNEL_CACHE_DIR):
+    """
+    Returns the quantum kernel matrix between X1 and X2 as a read-only
+    memory-mapped array.
+
+    A matrix computed earlier for the same data and feature map is reopened
+    from cache_dir. Otherwise statevector_fn is called once per dataset and
+    the matrix is filled tile by tile across a process pool. When X1 and X2
+    are the same data only the upper-triangular tiles are computed,
+    each is mirrored, and the diagonal is set to exactly 1.
+    """
+    X1 = np.atleast_2d(np.asarray(X1, dtype=float))
+    symmetric = X2 is None or X2 is X1 or (np.shape(X2) == X1.shape and np.array_equal(X2, X1))
+    X2 = X1 if symmetric else np.atleast_2d(np.asarray(X2, dtype=float))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{kernel_cache_key(X1, X2, feature_map_key)}.npy")
+    if os.path.exists(path):
+        return np.load(path, mmap_mode="r")
+
+    psi1 = statevector_fn(X1)
+    psi2 = psi1 if symmetric else statevector_fn(X2)
+    n1, n2 = len(psi1), len(psi2)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float64, shape=(n1, n2)).flush()
+
+    tasks = []
+    for i, rows in enumerate(tile_ranges(n1, tile_size)):
+        for j, cols in enumerate(tile_ranges(n2, tile_size)):
+            if symmetric and j < i:
+                continue
+            tasks.append((tmp_path, rows, cols, psi1[rows[0]:rows[1]], psi2[cols[0]:cols[1]],
+                          symmetric and i != j))
+
+    if max_workers == 1 or len(tasks) == 1:
+        for task in tasks:
+            _compute_tile(task)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(_compute_tile, tasks))
+
+    if symmetric:
+        K = np.load(tmp_path, mmap_mode="r+")
+        np.fill_diagonal(K, 1.0)
+        K.flush()
+        del K
+    os.replace(tmp_path, path)
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pennylane as qml
+from sklearn.metrics import accuracy_score
+from sklearn.svm import LinearSVC
+
+from kernel_cache import cached_kernel_matrix
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from profiling import profiled
+
+# --------------------------
+# Part 1: Define Quantum Feature Map & Kernel in PennyLane
+# --------------------------
+# Use PennyLane's default.qubit simulator (fast and efficient)
+n_wires = 2
+dev = qml.device("default.qubit", wires=n_wires)
+
+@qml.qnode(dev)
+def feature_map(x):
+    # Use a simple embedding: encode each feature into a rotation angle
+    qml.AngleEmbedding(x, wires=range(n_wires))
+    # Introduce entanglement
+    qml.CNOT(wires=[0, 1])
+    qml.RZ(np.pi / 4, wires=1)
+    return qml.state()
+
+def quantum_kernel(x1, x2):
+    # Compute state vectors for both inputs
+    psi1 = feature_map(x1)
+    psi2 = feature_map(x2)
+    # The kernel is the squared magnitude of the inner product
+    return np.abs(np.vdot(psi1, psi2))**2
+
+# --------------------------
+# Part 1b: Closed-form NumPy fast path for the feature map
+# --------------------------
+# The same circuit as feature_map, written as a gate list. Angles are either
+# a constant or ("x", k) for feature k of each sample. AngleEmbedding uses RX.
+FEATURE_MAP_OPS = [
+    ("RX", [0], ("x", 0)),
+    ("RX", [1], ("x", 1)),
+    ("CNOT", [0, 1], None),
+    ("RZ", [1], np.pi / 4),
+]
+SUPPORTED_FAST_GATES = {"RX", "RY", "RZ", "CNOT"}
+
+def rotation_matrices(gate, theta):
+    # Batched 2x2 rotation matrices, shape (batch, 2, 2)
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    zero = np.zeros_like(theta)
+    if gate == "RX":
+        rows = [[c, -1j * s], [-1j * s, c]]
+    elif gate == "RY":
+        rows = [[c, -s], [s, c]]
+    else:  # RZ
+        rows = [[np.exp(-0.5j * theta), zero], [zero, np.exp(0.5j * theta)]]
+    return np.array(rows, dtype=complex).transpose(2, 0, 1)
+
+def simulate_feature_map(X, ops=FEATURE_MAP_OPS, wires=n_wires):
+    # Applies ops to |0...0> for every row of X at once. The state is kept as a
+    # (batch, 2, ..., 2) tensor with wire 0 as the most significant qubit,
+    # matching PennyLane's ordering.
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    batch = X.shape[0]
+    state = np.zeros((batch,) + (2,) * wires, dtype=complex)
+    state[(slice(None),) + (0,) * wires] = 1.0
+    for gate, op_wires, angle in ops:
+        if gate == "CNOT":
+            control, target = op_wires
+            index = [slice(None)] * (wires + 1)
+            index[control + 1] = 1
+            target_axis = target if target > control else target + 1
+            state[tuple(index)] = np.flip(state[tuple(index)], axis=target_axis)
+            continue
+        if isinstance(angle, tuple):
+            theta = X[:, angle[1]]
+        else:
+            theta = np.full(batch, float(angle))
+        # Broadcast the per-sample 2x2 matrix over the other wires' axes
+        u = rotation_matrices(gate, theta).reshape((batch, 2, 2) + (1,) * (wires - 1))
+        axis = op_wires[0] + 1
+        amp0, amp1 = np.take(state, 0, axis=axis), np.take(state, 1, axis=axis)
+        state = np.stack([u[:, 0, 0] * amp0 + u[:, 0, 1] * amp1,
+                          u[:, 1, 0] * amp0 + u[:, 1, 1] * amp1], axis=axis)
+    return state.reshape(batch, 2**wires)
+
+_fast_path_valid = None
+
+def fast_path_available(num_checks=16, seed=0):
+    # The fast path is used only if every gate is supported and it matches
+    # default.qubit on random inputs. The check runs once and is remembered.
+    global _fast_path_valid
+    if _fast_path_valid is None:
+        if any(gate not in SUPPORTED_FAST_GATES for gate, _, _ in FEATURE_MAP_OPS):
+            _fast_path_valid = False
+        else:
+            rng = np.random.default_rng(seed)
+            samples = rng.uniform(-np.pi, np.pi, size=(num_checks, n_wires))
+            reference = np.vstack([np.asarray(feature_map(x)) for x in samples])
+            _fast_path_valid = bool(np.allclose(simulate_feature_map(samples), reference, atol=1e-10))
+        if not _fast_path_valid:
+            print("Fast feature map does not match default.qubit; falling back to PennyLane")
+    return _fast_path_valid
+
+# Simulate the feature map once per sample: with the closed-form NumPy fast
+# path when it is validated, otherwise with PennyLane parameter broadcasting
+# over a whole batch of inputs in each call. fast=False forces PennyLane.
+@profiled("statevectors")
+def compute_statevectors(X, batch_size=1024, fast=None):
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    if fast_path_available() if fast is None else fast:
+        return simulate_feature_map(X)
+    states = [np.asarray(feature_map(X[start:start + batch_size])).reshape(-1, 2**n_wires)
+              for start in range(0, X.shape[0], batch_size)]
+    return np.vstack(states)
+
+# Identifies the feature map in kernel cache keys by fingerprinting its
+# statevectors on fixed probe inputs, so any edit to the circuit
+# invalidates every cached matrix
+def feature_map_key(num_probes=16):
+    probes = np.linspace(-np.pi, np.pi, num_probes * n_wires).reshape(num_probes, n_wires)
+    states = np.round(compute_statevectors(probes), 10) + 0.0
+    return hashlib.sha256(states.tobytes()).hexdigest()
+
+# Compute the quantum kernel matrix for training data:
+# K[i, j] = |<psi(x1_i)|psi(x2_j)>|^2 = |Psi1^* Psi2^T|^2, filled in tiles
+# (upper triangle only when X1 and X2 match) and cached on disk as a .npy
+@profiled("compute_kernel_matrix")
+def compute_kernel_matrix(X1, X2):
+    return cached_kernel_matrix(X1, X2, compute_statevectors, feature_map_key())
+
+# Nystroem approximation: choose m landmark samples, evaluate only the n x m
+# kernel block, and map each sample to m features phi(x) such that
+# phi(x) . phi(x') ~= k(x, x'). A linear model on phi then stands in for
+# the O(n^2) precomputed-kernel SVC.
+def fit_nystroem(X, m, seed=42, eps=1e-10):
+    rng = np.random.default_rng(seed)
+    landmarks = X[rng.choice(X.shape[0], size=min(m, X.shape[0]), replace=False)]
+    psi_landmarks = compute_statevectors(landmarks)
+    K_mm = np.abs(psi_landmarks.conj() @ psi_landmarks.T)**2
+    eigenvalues, eigenvectors = np.linalg.eigh(K_mm)
+    keep = eigenvalues > eps * eigenvalues.max()
+    projection = eigenvectors[:, keep] / np.sqrt(eigenvalues[keep])
+    return psi_landmarks, projection
+
+def nystroem_transform(X, psi_landmarks, projection, batch_size=8192):
+    features = []
+    for start in range(0, X.shape[0], batch_size):
+        psi = compute_statevectors(X[start:start + batch_size])
+        features.append((np.abs(psi.conj() @ psi_landmarks.T)**2) @ projection)
+    return np.vstack(features)
+
+def train_nystroem_svm(X_fit, y_fit, m, seed=42):
+    psi_landmarks, projection = fit_nystroem(X_fit, m, seed)
+    model = LinearSVC(dual="auto")
+    model.fit(nystroem_transform(X_fit, psi_landmarks, projection), y_fit)
+    return model, psi_landmarks, projection
+
+# Accuracy vs number of landmarks m, compared with the exact kernel SVM
+def nystroem_accuracy_report(X_fit, y_fit, X_eval, y_eval, landmark_counts, exact_accuracy):
+    K_exact = compute_kernel_matrix(X_fit, X_fit)
+    rows = []
+    for m in landmark_counts:
+        model, psi_landmarks, projection = train_nystroem_svm(X_fit, y_fit, m)
+        phi_fit = nystroem_transform(X_fit, psi_landmarks, projection)
+        phi_eval = nystroem_transform(X_eval, psi_landmarks, projection)
+        kernel_error = np.linalg.norm(K_exact - phi_fit @ phi_fit.T) / np.linalg.norm(K_exact)
+        rows.append({
+            "m": int(min(m, X_fit.shape[0])),
+            "accuracy": float(accuracy_score(y_eval, model.predict(phi_eval))),
+            "exact_accuracy": float(exact_accuracy),
+            "relative_kernel_error": float(kernel_error),
+        })
+    return rows
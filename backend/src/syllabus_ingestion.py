@@ -0,0 +1,188 @@
+import re
+import json
+import logging
+
+from classical_ml_model import extract_course_name, extract_passing_grade
+
+# Grading components every syllabus must define, in the same structure the
+# AI assistant returns from AI_integration.extract_syllabus_info
+REQUIRED_COMPONENTS = ['homework', 'quizzes', 'midterm', 'final_exam']
+
+# Names a syllabus may use for each component (matched case-insensitively)
+COMPONENT_ALIASES = {
+    'homework': ['homework', 'homeworks', 'hw', 'assignments', 'problem sets'],
+    'quizzes': ['quiz', 'quizzes'],
+    'midterm': ['midterm', 'midterms', 'midterm exam', 'midterm exams'],
+    'final_exam': ['final', 'final exam', 'finals'],
+}
+
+# Documents scoring below this are sent to the LLM path
+MIN_LOCAL_CONFIDENCE = 0.9
+# Weights must sum to 100 within this many points to be trusted locally
+WEIGHT_SUM_TOLERANCE = 0.5
+
+# Any alias (plus the combined "exam(s)"), longest first so "Final Exam"
+# is not read as "Final". Matching starts at the alias itself, so leading
+# words ("Individual Homework", "Grading Policy: Homework") are skipped.
+COMPONENT_LABEL = r'\b(' + '|'.join(
+    r'\s+'.join(re.escape(word) for word in alias.split())
+    for alias in sorted({a for aliases in COMPONENT_ALIASES.values() for a in aliases} | {'exam', 'exams'},
+                        key=len, reverse=True)) + r')\b'
+
+# The separator is optional: "Homework: 25%", "Homework - 25%" and "Homework 25%"
+WEIGHT_PATTERN = re.compile(COMPONENT_LABEL + r'\s*[:\-]?\s*(\d+(?:\.\d+)?)\s*%', re.IGNORECASE)
+POINTS_PATTERN = re.compile(COMPONENT_LABEL + r'\s*[:\-]?\s*(\d+(?:\.\d+)?)\s*(?:points|pts)\b',
+                            re.IGNORECASE)
+
+def match_component(name):
+    """Maps a syllabus label such as "Final Exam" to a component key, or None."""
+    name = " ".join(name.lower().split())
+    for component, aliases in COMPONENT_ALIASES.items():
+        if name in aliases:
+            return component
+    return None
+
+def extract_components_local(text):
+    """
+    Regex extraction of the points and weight of each grading component.
+    Handles multi-word labels ("Final Exam: 40%") that
+    classical_ml_model.extract_grading_scheme cannot see. Returns the
+    homework/quizzes/midterm/final_exam structure with None for anything
+    not found.
+    """
+    components = {c: {"points": None, "weight": None} for c in REQUIRED_COMPONENTS}
+    for label, weight in WEIGHT_PATTERN.findall(text):
+        component = match_component(label)
+        if component and components[component]["weight"] is None:
+            components[component]["weight"] = float(weight)
+    for label, points in POINTS_PATTERN.findall(text):
+        component = match_component(label)
+        if component and components[component]["points"] is None:
+            components[component]["points"] = float(points)
+
+    # A single "Exams" weight covers both exams only when neither is listed
+    if components['midterm']['weight'] is None and components['final_exam']['weight'] is None:
+        for label, weight in WEIGHT_PATTERN.findall(text):
+            if label.strip().lower() in ('exam', 'exams'):
+                components['final_exam']['weight'] = float(weight)
+                break
+    return components
+
+def merge_components(components, new_components):
+    """Fills the points and weights still missing in components from new_components."""
+    return {c: {metric: components[c][metric] if components[c][metric] is not None else new_components[c][metric]
+                for metric in ['points', 'weight']}
+            for c in REQUIRED_COMPONENTS}
+
+def extraction_confidence(components):
+    """
+    Confidence in [0, 1]: the fraction of required components with a
+    weight times how close the weights sum to 100. A sum off by more than
+    WEIGHT_SUM_TOLERANCE is halved on top, so e.g. a complete extraction
+    summing to 105 scores 0.475 and goes to the LLM. A complete extraction
+    whose weights sum to 100 scores 1.0.
+    """
+    weights = [components[c]["weight"] for c in REQUIRED_COMPONENTS]
+    found = [w for w in weights if w is not None]
+    coverage = len(found) / len(REQUIRED_COMPONENTS)
+    deviation = abs(sum(found) - 100.0)
+    consistency = max(0.0, 1.0 - deviation / 100.0) if found else 0.0
+    if deviation > WEIGHT_SUM_TOLERANCE:
+        # Weights that do not add up are never trusted on their own
+        consistency *= 0.5
+    return coverage * consistency
+
+def normalize_components(info):
+    """
+    Coerces an extraction (local or LLM) to the shared structure with float
+    points and weights, accepting values such as "25%" or "100 pts".
+    """
+    components = {}
+    for component in REQUIRED_COMPONENTS:
+        entry = (info or {}).get(component) or {}
+        normalized = {}
+        for metric in ['points', 'weight']:
+            value = entry.get(metric)
+            if isinstance(value, str):
+                number = re.search(r'\d+(?:\.\d+)?', value)
+                value = float(number.group()) if number else None
+            normalized[metric] = float(value) if value is not None else None
+        components[component] = normalized
+    return components
+
+def ingest_syllabus(syllabus_text, client=None, assistant_id=None, min_confidence=MIN_LOCAL_CONFIDENCE):
+    """
+    Tiered syllabus parsing. The local regex extractors always run first;
+    the remote assistant is only called when their confidence is below
+    min_confidence and a client is available.
+    Returns a dict with course_name, passing_grade, components (the shared
+    homework/quizzes/midterm/final_exam structure), confidence and source
+    ("local" or "llm").
+    """
+    components = extract_components_local(syllabus_text)
+    confidence = extraction_confidence(components)
+    source = "local"
+
+    if confidence < min_confidence and client is not None and assistant_id is not None:
+        # Imported lazily so the local path needs neither PyPDF2 nor openai
+        from AI_integration import extract_syllabus_info
+        llm_info = extract_syllabus_info(client, assistant_id, syllabus_text)
+        if llm_info:
+            llm_components = normalize_components(llm_info)
+            llm_confidence = extraction_confidence(llm_components)
+            if llm_confidence >= confidence:
+                components, confidence, source = llm_components, llm_confidence, "llm"
+        else:
+            logging.error("LLM syllabus extraction failed; keeping the local result")
+
+    return {
+        'course_name': extract_course_name(syllabus_text),
+        'passing_grade': extract_passing_grade(syllabus_text),
+        'components': components,
+        'confidence': confidence,
+        'source': source,
+    }
+
+def ingest_syllabus_pdf(pdf_path, client=None, assistant_id=None, min_confidence=MIN_LOCAL_CONFIDENCE):
+    """
+    Streams a PDF's pages and runs ingest_syllabus on them. Each page is
+    parsed once and merged into the components found so far; reading stops
+    as soon as every required component has a weight and the weights sum
+    to 100, so long course packets are rarely read in full.
+    """
+    from AI_integration import iter_pdf_pages
+    pages = []
+    components = extract_components_local("")
+    page_iter = iter_pdf_pages(pdf_path)
+    try:
+        for page_text in page_iter:
+            pages.append(page_text)
+            components = merge_components(components, extract_components_local(page_text))
+            if extraction_confidence(components) >= 1.0:
+                break
+    finally:
+        # Closing the generator caches the pages read so far
+        page_iter.close()
+    return ingest_syllabus("".join(pages), client, assistant_id, min_confidence)
+
+if __name__ == "__main__":
+    syllabus_text = """
+    Course Title: Introduction to Data Science
+    Grading Policy: Homework: 25%, Quizzes: 10%, Midterm Exam: 25%, Final Exam: 40%
+    Homework: 200 points
+    Passing Grade: 60
+    """
+    print(json.dumps(ingest_syllabus(syllabus_text), indent=2))
+
+    # Table layout without separators, as in CS182_syllabus.pdf
+    table_text = """
+    Individual Homework 25% Week 1-15
+    Individual Quizzes 10% Week 1-15
+    Midterm 30% Tuesday March 11, 8 - 9:30 PM
+    Final Exam 35% TBD
+    """
+    result = ingest_syllabus(table_text)
+    weights = {c: v['weight'] for c, v in result['components'].items()}
+    assert weights == {'homework': 25.0, 'quizzes': 10.0, 'midterm': 30.0, 'final_exam': 35.0}, weights
+    assert result['confidence'] == 1.0, result['confidence']
+    print("Table layout:", json.dumps(weights))
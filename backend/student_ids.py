@@ -0,0 +1,91 @@
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# Dense int32 code of each student, stored next to student_id in the data
+STUDENT_CODE_COLUMN = 'student_code'
+# The code -> external ID dictionary lives beside the data it encodes
+ID_DICTIONARY_NAME = 'student_ids.parquet'
+
+class StudentIdMap:
+    """
+    Two-way mapping between external student IDs ("STU0001") and dense
+    int32 codes 0..n-1. Codes are append-only: encoding new IDs never
+    changes existing codes, so files encoded at different times still join.
+    """
+    def __init__(self, ids=()):
+        self.ids = pd.Index(pd.unique(pd.Series(list(ids), dtype=object)), dtype=object)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def encode(self, ids, extend=True):
+        """
+        Codes for a sequence of IDs. Unknown IDs are appended to the
+        dictionary when extend is set; otherwise they raise KeyError.
+        """
+        ids = pd.Series(ids, dtype=object).to_numpy()
+        codes = self.ids.get_indexer(ids)
+        unknown = codes < 0
+        if unknown.any():
+            if not extend:
+                raise KeyError(f"Unknown student IDs: {list(pd.unique(ids[unknown]))[:5]}")
+            self.ids = self.ids.append(pd.Index(pd.unique(ids[unknown]), dtype=object))
+            codes = self.ids.get_indexer(ids)
+        if len(self.ids) > np.iinfo(np.int32).max:
+            raise OverflowError("Too many students for int32 codes")
+        return codes.astype(np.int32)
+
+    def decode(self, codes):
+        """External IDs for a sequence of codes."""
+        return self.ids.to_numpy()[np.asarray(codes, dtype=np.int64)]
+
+    def save(self, path):
+        """Writes the dictionary atomically (code is the row position)."""
+        frame = pd.DataFrame({'student_id': self.ids.to_numpy(dtype=object),
+                              STUDENT_CODE_COLUMN: np.arange(len(self.ids), dtype=np.int32)})
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        frame = pd.read_parquet(path).sort_values(STUDENT_CODE_COLUMN)
+        return cls(frame['student_id'].astype(object))
+
+def dictionary_path(data_path):
+    """The ID dictionary shared by all data files in data_path's directory."""
+    return os.path.join(os.path.dirname(os.path.abspath(data_path)), ID_DICTIONARY_NAME)
+
+def add_student_codes(df, dictionary, rewrite=False):
+    """
+    Returns df with a student_code column, encoding its student_id values
+    against the dictionary file (extending and saving it when new students
+    appear, or always with rewrite). Called once when data is ingested.
+    """
+    id_map = StudentIdMap.load(dictionary)
+    known = len(id_map)
+    codes = id_map.encode(df['student_id'].astype(object))
+    if rewrite or len(id_map) != known:
+        id_map.save(dictionary)
+    return df.assign(**{STUDENT_CODE_COLUMN: codes})
+
+def student_keys(df):
+    """
+    Integer student keys for groupbys and joins: the stored student_code if
+    present, otherwise the codes of the categorical student_id (valid
+    within this DataFrame only).
+    """
+    if STUDENT_CODE_COLUMN in df.columns:
+        return df[STUDENT_CODE_COLUMN].astype(np.int32)
+    return pd.Series(df['student_id'].astype('category').cat.codes.astype(np.int32),
+                     index=df.index, name=STUDENT_CODE_COLUMN)
+
+def decode_students(df, dictionary):
+    """Restores student_id from student_code at an output boundary."""
+    id_map = StudentIdMap.load(dictionary)
+    return df.assign(student_id=id_map.decode(df[STUDENT_CODE_COLUMN]))
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+from sklearn.calibration import calibration_curve
+
+# Cutoff used when none is given: failure_prob >= this marks a student at risk
+DEFAULT_THRESHOLD = 0.65
+
+INDEX_COLUMNS = ['student_id', 'course_name', 'week', 'failure_prob']
+
+class ThresholdIndex:
+    """
+    Failure probabilities sorted once per (course_name, week), so any
+    cutoff can be queried by binary search instead of rescanning or
+    rescoring.
+
+    Rows are held in one array sorted by course, week and failure_prob;
+    each group is a contiguous [start, stop) slice. If a label column
+    (1 = failed) is given, a running count of positives makes precision and
+    recall at any cutoff O(log n) as well.
+    """
+    def __init__(self, df, label_column=None):
+        columns = INDEX_COLUMNS + ([label_column] if label_column else [])
+        data = df[columns].dropna(subset=['failure_prob']).copy()
+        data['course_name'] = data['course_name'].astype(str)
+        data['week'] = data['week'].astype(int)
+        self.data = data.sort_values(['course_name', 'week', 'failure_prob'], kind='stable').reset_index(drop=True)
+        self.probs = self.data['failure_prob'].to_numpy(dtype=float)
+        self.label_column = label_column
+
+        # Group boundaries are where the (course, week) key changes
+        courses = self.data['course_name'].to_numpy()
+        weeks = self.data['week'].to_numpy()
+        changes = np.flatnonzero((courses[1:] != courses[:-1]) | (weeks[1:] != weeks[:-1])) + 1
+        starts = np.concatenate([[0], changes]) if len(self.data) else np.array([], dtype=int)
+        stops = np.concatenate([changes, [len(self.data)]]) if len(self.data) else np.array([], dtype=int)
+        self.groups = {(courses[start], int(weeks[start])): (int(start), int(stop))
+                       for start, stop in zip(starts, stops)}
+
+        if label_column:
+            labels = self.data[label_column].to_numpy(dtype=int)
+            # positives[i] = number of positive labels in rows [0, i)
+            self.positives = np.concatenate([[0], np.cumsum(labels)])
+
+    def _slices(self, course=None, week=None):
+        return [bounds for (c, w), bounds in self.groups.items()
+                if (course is None or c == str(course)) and (week is None or w == int(week))]
+
+    def _first_at_least(self, start, stop, threshold):
+        return start + int(np.searchsorted(self.probs[start:stop], threshold, side='left'))
+
+    def count_at_least(self, threshold, course=None, week=None):
+        """Number of students with failure_prob >= threshold."""
+        return sum(stop - self._first_at_least(start, stop, threshold)
+                   for start, stop in self._slices(course, week))
+
+    def students_between(self, low, high, course=None, week=None):
+        """Rows with low <= failure_prob <= high, riskiest first."""
+        parts = []
+        for start, stop in self._slices(course, week):
+            first = self._first_at_least(start, stop, low)
+            last = start + int(np.searchsorted(self.probs[start:stop], high, side='right'))
+            parts.append(self.data.iloc[first:last])
+        if not parts:
+            return self.data.iloc[0:0]
+        return pd.concat(parts).sort_values('failure_prob', ascending=False, kind='stable')
+
+    def students_at_least(self, threshold, course=None, week=None):
+        """Rows with failure_prob >= threshold, riskiest first."""
+        return self.students_between(threshold, np.inf, course, week)
+
+    def precision_recall(self, threshold, course=None, week=None):
+        """
+        Precision and recall of flagging failure_prob >= threshold, against
+        the label column. Either is None when undefined (nothing flagged or
+        no positives).
+        """
+        if not self.label_column:
+            raise ValueError("This index was built without labels")
+        flagged = true_positives = positives = 0
+        for start, stop in self._slices(course, week):
+            first = self._first_at_least(start, stop, threshold)
+            flagged += stop - first
+            true_positives += int(self.positives[stop] - self.positives[first])
+            positives += int(self.positives[stop] - self.positives[start])
+        return {
+            'threshold': float(threshold),
+            'flagged': flagged,
+            'precision': true_positives / flagged if flagged else None,
+            'recall': true_positives / positives if positives else None,
+        }
+
+    def sweep(self, thresholds, course=None, week=None):
+        """Counts (and precision/recall, if labelled) at each cutoff."""
+        if self.label_column:
+            return [self.precision_recall(t, course, week) for t in thresholds]
+        return [{'threshold': float(t), 'flagged': self.count_at_least(t, course, week)} for t in thresholds]
+
+    def calibration(self, course=None, week=None, n_bins=10):
+        """Observed failure rate against mean predicted probability per bin."""
+        if not self.label_column:
+            raise ValueError("This index was built without labels")
+        rows = [self.data.iloc[start:stop] for start, stop in self._slices(course, week)]
+        subset = pd.concat(rows) if rows else self.data.iloc[0:0]
+        prob_true, prob_pred = calibration_curve(subset[self.label_column], subset['failure_prob'], n_bins=n_bins)
+        return {'prob_true': prob_true.tolist(), 'prob_pred': prob_pred.tolist()}
+
+    def summary(self, threshold=DEFAULT_THRESHOLD, course=None, week=None):
+        """JSON-ready answer for one cutoff, used by the API."""
+        result = {'threshold': float(threshold), 'total': sum(stop - start for start, stop in self._slices(course, week)),
+                  'flagged': self.count_at_least(threshold, course, week)}
+        if self.label_column:
+            result.update(self.precision_recall(threshold, course, week))
+        return result
+
+    def save(self, path):
+        self.data.to_parquet(path, index=False)
+
+def load_index(path):
+    """
+    Reloads an index saved with ThresholdIndex.save. A column beyond
+    INDEX_COLUMNS is the label column.
+    """
+    df = pd.read_parquet(path)
+    extra = [c for c in df.columns if c not in INDEX_COLUMNS]
+    return ThresholdIndex(df, extra[0] if extra else None)
@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
@@ -7,24 +6,35 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import TimeSeriesSplit, GridSearchCV
 import joblib
 
+from parquet_loader import load_grades
+from profiling import profiled, print_summary, stage, write_run_report
+from student_ids import student_keys
+from threshold_index import DEFAULT_THRESHOLD, ThresholdIndex
+
+@profiled("train_proper_model")
 def train_proper_model():
     # Load data with proper temporal sorting
-    df = pd.read_parquet("complete_student_grades.parquet")
-    df = df.sort_values(['student_id', 'course_name', 'week'])
-    
-    # Use ONLY FINAL OUTCOME as label (critical fix)
-    df['failure'] = df.groupby(['student_id', 'course_name'])['final_outcome'].transform(
-        lambda x: x.ffill().bfill().eq("fail").astype(int)
-    )
-    df = df.dropna(subset=['failure'])
-    
-    # Temporal feature engineering (no future leakage)
-    df['grade_trend'] = df.groupby(['student_id', 'course_name'])['current_grade'].transform(
-        lambda x: x.rolling(3, min_periods=1).mean().pct_change()
-    )
-    df['recent_hw_drop'] = df.groupby(['student_id', 'course_name'])['homework_grade'].transform(
-        lambda x: (x.rolling(2).mean().diff() < -5).astype(int)
-    )
+    with stage("load") as step:
+        df = load_grades("complete_student_grades.parquet")
+        # Integer student codes stand in for the ID strings in sorts and groupbys
+        df['student_key'] = student_keys(df)
+        df = df.sort_values(['student_key', 'course_name', 'week'])
+        step["rows"] = len(df)
+    
+    with stage("feature_engineering", rows=len(df)):
+        # Use ONLY FINAL OUTCOME as label (critical fix)
+        df['failure'] = df.groupby(['student_key', 'course_name'], observed=True)['final_outcome'].transform(
+            lambda x: x.ffill().bfill().eq("fail").astype(int)
+        )
+        df = df.dropna(subset=['failure'])
+    
+        # Temporal feature engineering (no future leakage)
+        df['grade_trend'] = df.groupby(['student_key', 'course_name'], observed=True)['current_grade'].transform(
+            lambda x: x.rolling(3, min_periods=1).mean().pct_change()
+        )
+        df['recent_hw_drop'] = df.groupby(['student_key', 'course_name'], observed=True)['homework_grade'].transform(
+            lambda x: (x.rolling(2).mean().diff() < -5).astype(int)
+        )
     
     # Features without current_grade (prevents target leakage)
     features = [
@@ -52,11 +62,25 @@ def train_proper_model():
     # Grid search for threshold calibration
     param_grid = {'clf__C': [0.01, 0.1, 1, 10]}
     search = GridSearchCV(pipe, param_grid, cv=tscv, scoring='average_precision')
-    search.fit(df[features], df['failure'])
+    with stage("grid_search", rows=len(df)):
+        search.fit(df[features], df['failure'])
     
     # Save best model
-    joblib.dump(search.best_estimator_, 'temporal_model.pkl')
+    with stage("save_model"):
+        joblib.dump(search.best_estimator_, 'temporal_model.pkl')
     print(f"Best model AP: {search.best_score_:.2f}")
+    
+    # Labelled index for precision/recall and calibration at any cutoff
+    # (scored in-sample, since TimeSeriesSplit never predicts its first fold)
+    with stage("calibration_index", rows=len(df)):
+        scored = df.assign(failure_prob=search.best_estimator_.predict_proba(df[features])[:, 1])
+        index = ThresholdIndex(scored, label_column='failure')
+        index.save('calibration_index.parquet')
+    metrics = index.precision_recall(DEFAULT_THRESHOLD)
+    print(f"At threshold {DEFAULT_THRESHOLD}: {metrics['flagged']} flagged, "
+          f"precision {metrics['precision']}, recall {metrics['recall']}")
 
 if __name__ == "__main__":
-    train_proper_model()
\ No newline at end of file
+    train_proper_model()
+    print_summary()
+    write_run_report()
\ No newline at end of file
@@ -4,6 +4,10 @@ from sklearn.preprocessing import StandardScaler
 import joblib
 import numpy as np
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from parquet_loader import load_grades
 
 # Configuration
 DATA_PATH = "student_grades.parquet"
@@ -21,21 +25,8 @@ model = joblib.load("logistic_model.pkl")
 scaler = joblib.load("scaler.pkl")
 
 def load_and_preprocess():
-    # Load without specifying dtype
-    df = pd.read_parquet(DATA_PATH)
-    
-    # Convert data types
-    dtype = {
-        'student_id': 'category',
-        'course_name': 'category',
-        'week': 'int8',
-        'homework_grade': 'float32',
-        'quiz_grade': 'float32',
-        'midterm_grade': 'float32',
-        'final_exam_grade': 'float32',
-        'current_grade': 'float32'
-    }
-    df = df.astype(dtype)
+    # Read straight into categorical / int8 / float32 columns
+    df = load_grades(DATA_PATH)
     
     # Improved missing value handling
     for col in ['midterm_grade', 'final_exam_grade']:
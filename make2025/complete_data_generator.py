@@ -3,6 +3,15 @@ import numpy as np
 from datetime import datetime
 from typing import List, Dict
 
+# Course weight configuration (align with syllabus), also used by
+# backend/grade_projection.py
+COURSE_WEIGHTS = {
+    "homework": 0.25,
+    "quizzes": 0.10,
+    "midterm": 0.25,
+    "final": 0.40
+}
+
 def generate_complete_student_data(
     output_path: str = "complete_student_grades.parquet",
     num_students: int = 100,
@@ -18,13 +27,7 @@ def generate_complete_student_data(
     np.random.seed(random_seed)
     data = []
     
-    # Course weight configuration (align with syllabus)
-    weights = {
-        "homework": 0.25,
-        "quizzes": 0.10,
-        "midterm": 0.25,
-        "final": 0.40
-    }
+    weights = COURSE_WEIGHTS
     
     for student_id in range(1, num_students + 1):
         student_id = f"STU{student_id:04d}"